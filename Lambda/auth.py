@@ -1,15 +1,31 @@
 import json
+import os
 import hashlib
 import boto3
 from boto3.dynamodb.conditions import Key
 import logging
 from decimal import Decimal
+from typing import Optional, List
+from cache import CachedTable, LRUCache
+from fields import parse_fields, projection_kwargs
+from profiling import profiled, phase
+from retry import SDK_RETRY_CONFIG, INTERACTIVE_POLICY, RetryController, RetryingTable
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('users')
+dynamodb = boto3.resource('dynamodb', config=SDK_RETRY_CONFIG)
+retry_controller = RetryController(INTERACTIVE_POLICY, phase=phase)
+cache_backend = LRUCache(max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 4096)))
+table = CachedTable(
+    RetryingTable(dynamodb.Table('users'), retry_controller), ('email',), cache_backend,
+    ttl=float(os.environ.get('USERS_CACHE_TTL', 5)),
+    negative_ttl=float(os.environ.get('USERS_CACHE_NEGATIVE_TTL', 0))
+)
+
+
+# Fields of the /user response, mapped to the users table attributes they come from.
+USER_FIELDS = {'email': 'email', 'username': 'username', 'subscriptions': 'subscription'}
 
 
 def decimal_converter(obj):
@@ -25,6 +41,11 @@ class AuthService:
         self.body = body
 
     def _generate_response(self, status_code: int, message: str, data=None):
+        with phase('serialization'):
+            body = json.dumps({
+                'data': data,
+                'message': message
+            }, default=decimal_converter)
         logger.info(f"Generating response: {status_code} - {message}")
 
         return {
@@ -34,16 +55,16 @@ class AuthService:
                 "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
                 "Access-Control-Allow-Headers": "Content-Type, Authorization"
             },
-            'body': json.dumps({
-                'data': data,
-                'message': message
-            }, default=decimal_converter)
+            'body': body
         }
 
-    def _get_user_by_email(self, email: str) -> dict:
+    def _get_user_by_email(self, email: str, attributes: Optional[List[str]] = None) -> dict:
         try:
             logger.info(f"Querying user by email: {email}")
-            response = table.get_item(Key={'email': email})
+            if attributes:
+                response = table.get_item(Key={'email': email}, **projection_kwargs(attributes))
+            else:
+                response = table.get_item(Key={'email': email})
             if response.get('Item'):
                 logger.info("User found in table. ")
                 return response['Item']
@@ -140,7 +161,15 @@ class AuthService:
                 logger.warning("Missing email in query parameters.")
                 return self._generate_response(400, "Missing user_id in query parameters")
 
-            user = self._get_user_by_email(user_id)
+            try:
+                fields = parse_fields(query_params.get('fields'), tuple(USER_FIELDS))
+            except ValueError as error:
+                logger.warning(f"Invalid fields: {error}")
+                return self._generate_response(400, str(error))
+
+            # `email` is always projected: the key doubles as the existence check.
+            attributes = ['email'] + [USER_FIELDS[field] for field in fields if field != 'email'] if fields else None
+            user = self._get_user_by_email(user_id, attributes)
 
             if not user:
                 logger.warning("User not found.")
@@ -148,9 +177,11 @@ class AuthService:
 
             user_data = {
                 'email': user['email'],
-                'username': user['username'],
+                'username': user.get('username'),
                 'subscriptions': user.get('subscription', [])
             }
+            if fields:
+                user_data = {field: user_data[field] for field in fields}
 
             logger.info("User retrieved successfully.")
             return self._generate_response(200, "User retrieved successfully", user_data)
@@ -160,6 +191,7 @@ class AuthService:
             return self._generate_response(500, "Internal Server Error")
 
 
+@profiled
 def lambda_handler(event, context):
     try:
         httpMethod = event.get('httpMethod', '')
@@ -169,6 +201,8 @@ def lambda_handler(event, context):
         raw_body = event.get('body')
         body = json.loads(raw_body) if isinstance(raw_body, str) else {}
         auth = AuthService(event, context, body)
+        retry_controller.set_deadline_from_context(context)
+        logger.info(f"Cache stats: {cache_backend.stats()}, retry stats: {retry_controller.stats()}")
 
         if path == "/login" and httpMethod == 'POST':
             return auth.login()
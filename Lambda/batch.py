@@ -0,0 +1,80 @@
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from cache import MISS, NOT_FOUND
+from retry import RetryController
+
+logger = logging.getLogger()
+
+# BatchGetItem accepts at most 100 keys per request.
+BATCH_GET_LIMIT = 100
+
+
+def _key_of(key: Dict[str, Any]) -> Tuple:
+    return tuple(sorted(key.items()))
+
+
+def fetch_items(
+        dynamodb,
+        lookups: Dict[str, Tuple[Any, Dict[str, Any]]],
+        controller: RetryController,
+        consistent: Iterable[str] = ()
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Fetch independent point lookups, possibly across tables, in as few round trips as possible.
+
+    `lookups` maps a caller-chosen name to (table, Key). Tables wrapped in CachedTable are
+    checked first and filled with whatever the batch returns. The rest go out together in
+    one BatchGetItem (per 100 keys). Lookups named in `consistent` skip the cache and their
+    tables are read with ConsistentRead, for callers that write back what they read.
+    Returns name -> item, or None if the item does not exist.
+    """
+    consistent = set(consistent)
+    consistent_tables = {lookups[name][0].name for name in consistent}
+    results: Dict[str, Optional[Dict[str, Any]]] = {}
+    tables: Dict[str, Any] = {}
+    key_attributes: Dict[str, Tuple[str, ...]] = {}
+    # table name -> key tuple -> (Key, [lookup names])
+    pending: Dict[str, Dict[Tuple, Tuple[Dict[str, Any], List[str]]]] = {}
+
+    for name, (table, key) in lookups.items():
+        cached = table.peek(key) if hasattr(table, 'peek') and name not in consistent else MISS
+        if cached is NOT_FOUND:
+            results[name] = None
+        elif cached is not MISS:
+            results[name] = cached
+        else:
+            tables[table.name] = table
+            key_attributes[table.name] = tuple(key)
+            # Duplicate keys are rejected by BatchGetItem, so collapse them.
+            pending.setdefault(table.name, {}).setdefault(_key_of(key), (key, []))[1].append(name)
+
+    requests = [(table_name, key) for table_name, keys in pending.items() for key, _ in keys.values()]
+    for start in range(0, len(requests), BATCH_GET_LIMIT):
+        request_items: Dict[str, Dict[str, Any]] = {}
+        for table_name, key in requests[start:start + BATCH_GET_LIMIT]:
+            table_request = request_items.setdefault(table_name, {'Keys': []})
+            table_request['Keys'].append(key)
+            if table_name in consistent_tables:
+                table_request['ConsistentRead'] = True
+
+        attempt = 0
+        while request_items:
+            response = controller.call(dynamodb.batch_get_item, RequestItems=request_items)
+            for table_name, items in response.get('Responses', {}).items():
+                for item in items:
+                    item_key = {attribute: item[attribute] for attribute in key_attributes[table_name]}
+                    _, names = pending[table_name][_key_of(item_key)]
+                    for name in names:
+                        results[name] = item
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                logger.warning(f"BatchGetItem left keys unprocessed, retrying (attempt {attempt})")
+                controller.pause(attempt)
+
+    for table_name, keys in pending.items():
+        for key, names in keys.values():
+            for name in names:
+                results.setdefault(name, None)
+            if hasattr(tables[table_name], 'store'):
+                tables[table_name].store(key, results[names[0]])
+    return results
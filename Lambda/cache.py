@@ -0,0 +1,163 @@
+import copy
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+# Returned by a backend when the key is not cached (or has expired).
+MISS = object()
+# Stored in place of an item when DynamoDB reported that the key does not exist.
+NOT_FOUND = object()
+
+
+class CacheBackend(ABC):
+    """Storage used by CachedTable. Implement this to plug in a shared cache (e.g. Redis)."""
+
+    @abstractmethod
+    def get(self, namespace: str, key: Tuple) -> Any:
+        """Return the cached value, or MISS."""
+
+    @abstractmethod
+    def set(self, namespace: str, key: Tuple, value: Any, ttl: float) -> None:
+        """Store a value for ttl seconds."""
+
+    @abstractmethod
+    def delete(self, namespace: str, key: Tuple) -> None:
+        """Drop a key, if present."""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters per namespace."""
+
+
+class LRUCache(CacheBackend):
+    """Bounded in-memory LRU with a per-entry expiry. Lives for the life of the container."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = Lock()
+
+    def _count(self, namespace: str, counter: str):
+        counters = self._counters.setdefault(
+            namespace, {'hits': 0, 'misses': 0, 'evictions': 0})
+        counters[counter] += 1
+
+    def get(self, namespace: str, key: Tuple) -> Any:
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._count(namespace, 'misses')
+                return MISS
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[entry_key]
+                self._count(namespace, 'misses')
+                return MISS
+            self._entries.move_to_end(entry_key)
+            self._count(namespace, 'hits')
+            return value
+
+    def set(self, namespace: str, key: Tuple, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        entry_key = (namespace, key)
+        with self._lock:
+            self._entries[entry_key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                (evicted_namespace, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_namespace, 'evictions')
+
+    def delete(self, namespace: str, key: Tuple) -> None:
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {namespace: dict(counters) for namespace, counters in self._counters.items()}
+
+
+class CachedTable:
+    """Read-through wrapper around a boto3 Table.
+
+    Plain get_item calls are served from the backend; put/update/delete calls made through
+    the wrapper invalidate the key. Everything else is passed straight to the table.
+    """
+
+    def __init__(
+            self,
+            table,
+            key_attributes: Tuple[str, ...],
+            backend: CacheBackend,
+            ttl: float,
+            negative_ttl: Optional[float] = None
+    ):
+        self.table = table
+        self.key_attributes = key_attributes
+        self.backend = backend
+        self.namespace = table.name
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+
+    def __getattr__(self, name):
+        return getattr(self.table, name)
+
+    @staticmethod
+    def _cache_key(key: Dict[str, Any]) -> Tuple:
+        return tuple(sorted(key.items()))
+
+    def peek(self, Key: Dict[str, Any]) -> Any:
+        """Cached item (a copy), NOT_FOUND, or MISS, without calling DynamoDB."""
+        cached = self.backend.get(self.namespace, self._cache_key(Key))
+        if cached is MISS or cached is NOT_FOUND:
+            return cached
+        # Callers mutate the returned item, so never hand out the cached object.
+        return copy.deepcopy(cached)
+
+    def store(self, Key: Dict[str, Any], item: Optional[Dict[str, Any]]):
+        """Cache a result fetched elsewhere (e.g. BatchGetItem); None caches a miss."""
+        if item is None:
+            self.backend.set(self.namespace, self._cache_key(Key), NOT_FOUND, self.negative_ttl)
+        else:
+            self.backend.set(self.namespace, self._cache_key(Key), copy.deepcopy(item), self.ttl)
+
+    def get_item(self, Key: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        # Projections and consistent reads have different semantics, so they skip the cache.
+        if kwargs:
+            return self.table.get_item(Key=Key, **kwargs)
+
+        cached = self.peek(Key)
+        if cached is NOT_FOUND:
+            return {}
+        if cached is not MISS:
+            return {'Item': cached}
+
+        response = self.table.get_item(Key=Key)
+        self.store(Key, response.get('Item'))
+        return response
+
+    def invalidate(self, Key: Dict[str, Any]):
+        self.backend.delete(self.namespace, self._cache_key(Key))
+
+    def put_item(self, Item: Dict[str, Any], **kwargs):
+        key = {attribute: Item[attribute] for attribute in self.key_attributes}
+        try:
+            return self.table.put_item(Item=Item, **kwargs)
+        finally:
+            self.invalidate(key)
+
+    def update_item(self, Key: Dict[str, Any], **kwargs):
+        try:
+            return self.table.update_item(Key=Key, **kwargs)
+        finally:
+            self.invalidate(Key)
+
+    def delete_item(self, Key: Dict[str, Any], **kwargs):
+        try:
+            return self.table.delete_item(Key=Key, **kwargs)
+        finally:
+            self.invalidate(Key)
@@ -0,0 +1,58 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+FACET_ATTRIBUTES: Tuple[str, ...] = ('year', 'artist', 'album')
+FACETS_ARTIFACT_VERSION = 1
+
+
+class FacetCounter:
+    """Counts values of the facet attributes while items stream past, in a single pass."""
+
+    def __init__(self, attributes: Tuple[str, ...] = FACET_ATTRIBUTES):
+        self.attributes = attributes
+        self.total = 0
+        self.counts: Dict[str, Counter] = {attribute: Counter() for attribute in attributes}
+
+    def add(self, item: Dict[str, Any]):
+        self.total += 1
+        for attribute in self.attributes:
+            value = item.get(attribute)
+            if value is not None:
+                # DynamoDB hands numbers back as Decimal; facet values are plain ints/strs.
+                self.counts[attribute][int(value) if attribute == 'year' else value] += 1
+
+    def consume(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Count every item and return them as a list."""
+        collected = []
+        for item in items:
+            self.add(item)
+            collected.append(item)
+        return collected
+
+    def to_response(self, limit: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+        return {
+            attribute: [{'value': value, 'count': count}
+                        for value, count in self.counts[attribute].most_common(limit)]
+            for attribute in self.attributes
+        }
+
+    def to_artifact(self) -> bytes:
+        """Compact JSON form written at ingestion time: [[value, count], ...] per facet."""
+        return json.dumps({
+            'version': FACETS_ARTIFACT_VERSION,
+            'total': self.total,
+            'facets': {attribute: [[value, count] for value, count in self.counts[attribute].most_common()]
+                       for attribute in self.attributes}
+        }, separators=(',', ':')).encode('utf-8')
+
+    @classmethod
+    def from_artifact(cls, raw: bytes) -> "FacetCounter":
+        artifact = json.loads(raw)
+        if artifact.get('version') != FACETS_ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported facets artifact version {artifact.get('version')}")
+        counter = cls(tuple(artifact['facets'].keys()))
+        counter.total = artifact['total']
+        for attribute, pairs in artifact['facets'].items():
+            counter.counts[attribute] = Counter({value: count for value, count in pairs})
+        return counter
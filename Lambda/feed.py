@@ -0,0 +1,222 @@
+import os
+import time
+import base64
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+import boto3
+from boto3.dynamodb.conditions import Key
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from retry import SDK_RETRY_CONFIG, INTERACTIVE_POLICY, BULK_POLICY, RetryController, RetryingTable
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# The feed table holds two kinds of items under generic pk/sk keys:
+#   ARTIST#<artist> / USER#<email>      follow edge, `songs` = subscribed songs by that artist
+#   FEED#<email>    / <ts>#<song key>   feed entry for a new song by a followed artist
+FEED_TABLE_NAME = os.environ.get('FEED_TABLE_NAME', 'feed')
+FEED_MAX_LENGTH = int(os.environ.get('FEED_MAX_LENGTH', 100))
+
+dynamodb = boto3.resource('dynamodb', config=SDK_RETRY_CONFIG)
+# Follow edges and feed pages are written/read on the music Lambda's request path.
+feed_retry_controller = RetryController(INTERACTIVE_POLICY)
+feed_table = RetryingTable(dynamodb.Table(FEED_TABLE_NAME), feed_retry_controller)
+# Fan-out runs in the stream Lambda and can afford to wait for capacity.
+fanout_retry_controller = RetryController(BULK_POLICY)
+fanout_table = RetryingTable(dynamodb.Table(FEED_TABLE_NAME), fanout_retry_controller)
+
+_deserializer = TypeDeserializer()
+_serializer = TypeSerializer()
+
+
+def _artist_pk(artist: str) -> str:
+    return f"ARTIST#{artist}"
+
+
+def _feed_pk(user_id: str) -> str:
+    return f"FEED#{user_id}"
+
+
+def follow_artist(user_id: str, artist: str, table=feed_table):
+    """Record one more subscribed song by the artist for the user."""
+    table.update_item(
+        Key={'pk': _artist_pk(artist), 'sk': f"USER#{user_id}"},
+        UpdateExpression='ADD songs :one',
+        ExpressionAttributeValues={':one': 1}
+    )
+
+
+def unfollow_artist(user_id: str, artist: str, table=feed_table):
+    """Record one fewer subscribed song; the edge is removed once no songs remain."""
+    key = {'pk': _artist_pk(artist), 'sk': f"USER#{user_id}"}
+    response = table.update_item(
+        Key=key,
+        UpdateExpression='ADD songs :minus_one',
+        ExpressionAttributeValues={':minus_one': -1},
+        ReturnValues='UPDATED_NEW'
+    )
+    if response.get('Attributes', {}).get('songs', 0) <= 0:
+        try:
+            table.delete_item(
+                Key=key,
+                ConditionExpression='songs <= :zero',
+                ExpressionAttributeValues={':zero': 0}
+            )
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            logger.info(f"User {user_id} re-followed {artist} concurrently, keeping edge")
+
+
+def encode_cursor(last_evaluated_key: Optional[Dict[str, Any]]) -> Optional[str]:
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(json.dumps(last_evaluated_key).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    if not isinstance(key, dict):
+        raise ValueError("Malformed cursor")
+    return key
+
+
+def get_feed_page(user_id: str, limit: int, cursor: Optional[str] = None, table=feed_table) -> Dict[str, Any]:
+    """Newest-first page of the user's feed. Cost is bounded by `limit`."""
+    query_kwargs: Dict[str, Any] = {
+        'KeyConditionExpression': Key('pk').eq(_feed_pk(user_id)),
+        'ScanIndexForward': False,
+        'Limit': limit
+    }
+    if cursor:
+        exclusive_start_key = decode_cursor(cursor)
+        if exclusive_start_key.get('pk') != _feed_pk(user_id):
+            raise ValueError("Cursor does not belong to this user")
+        query_kwargs['ExclusiveStartKey'] = exclusive_start_key
+    response = table.query(**query_kwargs)
+    items = [
+        {attribute: item[attribute] for attribute in ('artist', 'album', 'title', 'year', 'img_url', 'created_at')
+         if attribute in item}
+        for item in response.get('Items', [])
+    ]
+    return {'Items': items, 'cursor': encode_cursor(response.get('LastEvaluatedKey'))}
+
+
+class FeedFanout:
+    """Fans new music items out to the feeds of users following the song's artist."""
+
+    def __init__(self, table=feed_table, max_length: int = FEED_MAX_LENGTH):
+        self.table = table
+        self.max_length = max_length
+
+    def _followers(self, artist: str) -> List[str]:
+        followers = []
+        query_kwargs: Dict[str, Any] = {
+            'KeyConditionExpression': Key('pk').eq(_artist_pk(artist)),
+            'ProjectionExpression': 'sk'
+        }
+        while True:
+            response = self.table.query(**query_kwargs)
+            followers.extend(item['sk'][len('USER#'):] for item in response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return followers
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    def _trim(self, user_id: str):
+        """Delete entries beyond max_length, oldest first."""
+        query_kwargs: Dict[str, Any] = {
+            'KeyConditionExpression': Key('pk').eq(_feed_pk(user_id)),
+            'ScanIndexForward': False,
+            'ProjectionExpression': 'pk, sk'
+        }
+        kept = 0
+        stale = []
+        while True:
+            response = self.table.query(**query_kwargs)
+            for item in response.get('Items', []):
+                if kept < self.max_length:
+                    kept += 1
+                else:
+                    stale.append(item)
+            if 'LastEvaluatedKey' not in response:
+                break
+            query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        if stale:
+            with self.table.batch_writer() as batch:
+                for item in stale:
+                    batch.delete_item(Key={'pk': item['pk'], 'sk': item['sk']})
+            logger.info(f"Trimmed {len(stale)} old feed entries for {user_id}")
+
+    def fan_out(self, songs: Iterable[Dict[str, Any]]) -> int:
+        """Write a feed entry per (song, follower); returns the number of entries written."""
+        written = 0
+        touched_users = set()
+        with self.table.batch_writer(overwrite_by_pkeys=['pk', 'sk']) as batch:
+            for song in songs:
+                created_at = int(song.get('created_at', time.time()))
+                song_key = f"{song['artist']}#{song['album#title']}"
+                for user_id in self._followers(song['artist']):
+                    batch.put_item(Item={
+                        'pk': _feed_pk(user_id),
+                        'sk': f"{created_at:010d}#{song_key}",
+                        'artist': song['artist'],
+                        'album': song.get('album'),
+                        'title': song.get('title'),
+                        'year': song.get('year'),
+                        'img_url': song.get('img_url'),
+                        'created_at': created_at
+                    })
+                    touched_users.add(user_id)
+                    written += 1
+        for user_id in touched_users:
+            self._trim(user_id)
+        return written
+
+
+def songs_from_stream_event(event: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """New music items from a DynamoDB Streams event (INSERT records with a NewImage)."""
+    songs = []
+    for record in event.get('Records', []):
+        if record.get('eventName') != 'INSERT':
+            continue
+        stream_record = record.get('dynamodb', {})
+        new_image = stream_record.get('NewImage')
+        if not new_image:
+            continue
+        song = {name: _deserializer.deserialize(value) for name, value in new_image.items()}
+        if 'ApproximateCreationDateTime' in stream_record:
+            song['created_at'] = int(stream_record['ApproximateCreationDateTime'])
+        songs.append(song)
+    return songs
+
+
+def make_stream_event(items: Iterable[Dict[str, Any]], event_name: str = 'INSERT') -> Dict[str, Any]:
+    """Build a DynamoDB Streams-shaped event from plain items, to drive the handler locally."""
+    now = int(time.time())
+    return {
+        'Records': [
+            {
+                'eventName': event_name,
+                'eventSource': 'aws:dynamodb',
+                'dynamodb': {
+                    'ApproximateCreationDateTime': now,
+                    'Keys': {name: _serializer.serialize(item[name]) for name in ('artist', 'album#title')},
+                    'NewImage': {name: _serializer.serialize(value) for name, value in item.items()},
+                    'StreamViewType': 'NEW_IMAGE'
+                }
+            }
+            for item in items
+        ]
+    }
+
+
+def lambda_handler(event, context):
+    """Triggered by the music table's stream."""
+    songs = songs_from_stream_event(event)
+    logger.info(f"Received {len(event.get('Records', []))} stream records, {len(songs)} new songs")
+    if not songs:
+        return {'written': 0}
+    fanout_retry_controller.set_deadline_from_context(context)
+    written = FeedFanout(fanout_table).fan_out(songs)
+    logger.info(f"Wrote {written} feed entries")
+    return {'written': written}
@@ -0,0 +1,43 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Value of the `format` query parameter that returns list results as column arrays.
+COLUMNS_FORMAT = 'columns'
+
+
+def parse_fields(raw: Optional[str], allowed: Tuple[str, ...]) -> Optional[List[str]]:
+    """Parse a comma-separated `fields=` parameter. None means every field."""
+    if not raw:
+        return None
+    fields = []
+    for field in raw.split(','):
+        field = field.strip()
+        if not field:
+            continue
+        if field not in allowed:
+            raise ValueError(f"Unknown field '{field}', expected one of {', '.join(allowed)}")
+        if field not in fields:
+            fields.append(field)
+    return fields or None
+
+
+def projection_kwargs(attributes: Iterable[str]) -> Dict[str, Any]:
+    """ProjectionExpression for the attributes, with placeholders since e.g. `year` is reserved."""
+    names = {f"#p{index}": attribute for index, attribute in enumerate(attributes)}
+    return {
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names
+    }
+
+
+def select_fields(item: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    if fields is None:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def to_columns(items: List[Dict[str, Any]], fields: List[str]) -> Dict[str, Any]:
+    """Compact list result: one array per field instead of repeating keys in every item."""
+    return {
+        'columns': {field: [item.get(field) for item in items] for field in fields},
+        'count': len(items)
+    }
@@ -1,22 +1,89 @@
 import json
+import os
 import boto3
 from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from decimal import Decimal
+from cache import CachedTable, LRUCache
+from profiling import profiled, phase
+from retry import SDK_RETRY_CONFIG, INTERACTIVE_POLICY, RetryController, RetryingTable
+from facets import FacetCounter
+from snapshot import SnapshotCache
+from search_keys import normalize_search_key, ARTIST_NORM_YEAR_INDEX, TITLE_NORM_ALBUM_INDEX, ALBUM_NORM_INDEX
+from fields import COLUMNS_FORMAT, parse_fields, projection_kwargs, select_fields, to_columns
+from batch import fetch_items
+from feed import follow_artist, unfollow_artist, get_feed_page, feed_retry_controller, encode_cursor, decode_cursor
+from popularity import record_subscription, get_top, popularity_retry_controller, TOP_VIEW_LENGTH
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-dynamodb = boto3.resource('dynamodb')
-music_table = dynamodb.Table('music')
-users_table = dynamodb.Table('users')
+dynamodb = boto3.resource('dynamodb', config=SDK_RETRY_CONFIG)
+retry_controller = RetryController(INTERACTIVE_POLICY, phase=phase)
+# The feed and popularity helpers run on this Lambda's request path too.
+feed_retry_controller.phase = phase
+popularity_retry_controller.phase = phase
+s3 = boto3.client('s3')
+
+# Attributes clients may request with `fields=`; `album#title` is only a key.
+SONG_FIELDS = ('artist', 'album', 'title', 'year', 'img_url')
+# What /search returns by default: the stored song, without the internal *_norm index keys.
+SEARCH_RESULT_ATTRIBUTES = SONG_FIELDS + ('album#title',)
+
+FEED_PAGE_SIZE = 20
+FEED_MAX_PAGE_SIZE = 100
+TOP_DEFAULT_LIMIT = 10
+FACETS_PAGE_SIZE = 20
+FACETS_MAX_PAGE_SIZE = 100
+
+# Catalog-wide facet counts precomputed by scripts/image_s3_uploader.py at ingestion time.
+FACETS_BUCKET = os.environ.get('FACETS_BUCKET', 'a1-project-group-31')
+FACETS_KEY = os.environ.get('FACETS_KEY', 'catalog/facets.json')
+_catalog_facets: Optional[FacetCounter] = None
+
+# Optional columnar snapshot written by scripts/catalog_snapshot.py (e.g. catalog/music.snap).
+# When set, year-only searches read it instead of scanning the music table.
+CATALOG_SNAPSHOT_KEY = os.environ.get('CATALOG_SNAPSHOT_KEY')
+SNAPSHOT_SEARCH_LIMIT = int(os.environ.get('SNAPSHOT_SEARCH_LIMIT', 1000))
+catalog_snapshot = SnapshotCache(
+    s3, FACETS_BUCKET, CATALOG_SNAPSHOT_KEY,
+    check_interval=float(os.environ.get('CATALOG_SNAPSHOT_CHECK_INTERVAL', 300))
+) if CATALOG_SNAPSHOT_KEY else None
+
+# Song metadata is effectively immutable. User items change with every subscribe/unsubscribe,
+# possibly in another container, so the music routes read them consistently; the users
+# cache only holds what those reads return.
+cache_backend = LRUCache(max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 4096)))
+music_table = CachedTable(
+    RetryingTable(dynamodb.Table('music'), retry_controller), ('artist', 'album#title'), cache_backend,
+    ttl=float(os.environ.get('MUSIC_CACHE_TTL', 3600)),
+    negative_ttl=float(os.environ.get('MUSIC_CACHE_NEGATIVE_TTL', 60))
+)
+users_table = CachedTable(
+    RetryingTable(dynamodb.Table('users'), retry_controller), ('email',), cache_backend,
+    ttl=float(os.environ.get('USERS_CACHE_TTL', 5)),
+    negative_ttl=float(os.environ.get('USERS_CACHE_NEGATIVE_TTL', 0))
+)
 
 def decimal_converter(obj):
     if isinstance(obj, Decimal):
         return int(obj) if obj % 1 == 0 else float(obj)
     raise TypeError
 
+def load_catalog_facets() -> Optional[FacetCounter]:
+    global _catalog_facets
+    if _catalog_facets is None:
+        try:
+            logger.info(f"Loading catalog facets from s3://{FACETS_BUCKET}/{FACETS_KEY}")
+            response = s3.get_object(Bucket=FACETS_BUCKET, Key=FACETS_KEY)
+            _catalog_facets = FacetCounter.from_artifact(response['Body'].read())
+        except Exception as error:
+            logger.error(f"Error loading catalog facets: {error}")
+            return None
+    return _catalog_facets
+
 class MusicService:
 
     def __init__(self, event, context, body):
@@ -25,6 +92,11 @@ class MusicService:
         self.body = body
 
     def _generate_response(self, status_code: int, message: str, data=None):
+        with phase('serialization'):
+            body = json.dumps({
+                'data': data,
+                'message': message
+            }, default=decimal_converter)
         return {
             'statusCode': status_code,
             "headers": {
@@ -32,10 +104,7 @@ class MusicService:
                 "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
                 "Access-Control-Allow-Headers": "Content-Type, Authorization"
             },
-            'body': json.dumps({
-                'data': data,
-                'message': message
-            }, default=decimal_converter)
+            'body': body
         }
 
     def _filter_search(
@@ -44,47 +113,68 @@ class MusicService:
             title: Optional[str] = None,
             artist: Optional[str] = None,
             year: Optional[str] = None,
-            album: Optional[str] = None
+            album: Optional[str] = None,
+            projection: Optional[List[str]] = None,
+            all_pages: bool = False
     ) -> Optional[Dict[str, Any]]:
-        response = None
 
+        projection = projection or list(SEARCH_RESULT_ATTRIBUTES)
         try:
             key_condition_expression = None
-            filter_expression = None
             index_name = None
             query_kwargs: Dict[str, Any] = {}
 
-            if artist and year:
-                logger.info(f"ArtistYear Index selected.")
-                index_name = 'ArtistYearIndex'
-                key_condition_expression = Key('artist').eq(
-                    artist) & Key('year').eq(int(year))
-            elif title and album:
-                logger.info(f"TitleAlbum Index selected.")
-                index_name = 'TitleAlbumIndex'
-                key_condition_expression = Key('title').eq(
-                    title) & Key('album').eq(album)
-            elif artist and album:
-                logger.info(f"Base table PK and SK used.")
-                key_condition_expression = Key('artist').eq(
-                    artist) & Key('album#title').begins_with(album)
-
-            if title and not (title and album):
-                logger.info(f"Title based filter expression")
-                filter_expression = Attr('title').eq(title)
-            if album and not (title and album) and not (artist and album):
-                logger.info(f"Album based filter expression")
-                filter_expression = Attr('album#title').begins_with(album)
-            if year and not (artist and year):
-                logger.info(f"Year based filter expression")
-                filter_expression = Attr('year').eq(int(year))
-            if artist and not (artist and year) and not (artist and album):
-                logger.info(f"Artist based filter expression")
-                key_condition_expression = Key('artist').eq(artist)
+            # Match on the normalized copies so "taylor swift" finds "Taylor Swift".
+            title_norm = normalize_search_key(title) if title else None
+            artist_norm = normalize_search_key(artist) if artist else None
+            album_norm = normalize_search_key(album) if album else None
+            year_value = int(year) if year else None
+            keyed = set()
+
+            # Albums match on the whole normalized name (not a prefix, as the album#title
+            # sort key used to allow), so every album lookup can be a key condition.
+            if artist_norm and album_norm:
+                logger.info(f"AlbumNorm Index selected for artist and album.")
+                index_name = ALBUM_NORM_INDEX
+                key_condition_expression = Key('album_norm').eq(album_norm) & Key('artist_norm').eq(artist_norm)
+                keyed.update(('artist', 'album'))
+            elif artist_norm:
+                logger.info(f"ArtistNormYear Index selected.")
+                index_name = ARTIST_NORM_YEAR_INDEX
+                key_condition_expression = Key('artist_norm').eq(artist_norm)
+                keyed.add('artist')
+                if year_value is not None:
+                    key_condition_expression &= Key('year').eq(year_value)
+                    keyed.add('year')
+            elif title_norm:
+                logger.info(f"TitleNormAlbum Index selected.")
+                index_name = TITLE_NORM_ALBUM_INDEX
+                key_condition_expression = Key('title_norm').eq(title_norm)
+                keyed.add('title')
+                if album_norm:
+                    key_condition_expression &= Key('album_norm').eq(album_norm)
+                    keyed.add('album')
+            elif album_norm:
+                logger.info(f"AlbumNorm Index selected.")
+                index_name = ALBUM_NORM_INDEX
+                key_condition_expression = Key('album_norm').eq(album_norm)
+                keyed.add('album')
+
+            # Whatever the key condition did not cover is applied as a filter.
+            filters = []
+            if title_norm and 'title' not in keyed:
+                filters.append(Attr('title_norm').eq(title_norm))
+            if album_norm and 'album' not in keyed:
+                filters.append(Attr('album_norm').eq(album_norm))
+            if year_value is not None and 'year' not in keyed:
+                filters.append(Attr('year').eq(year_value))
 
             combined_filter_expression = None
-            if filter_expression:
-                combined_filter_expression = filter_expression
+            for filter_expression in filters:
+                if combined_filter_expression is None:
+                    combined_filter_expression = filter_expression
+                else:
+                    combined_filter_expression &= filter_expression
 
             if key_condition_expression:
                 logger.info(f"Key condition expression filtering")
@@ -95,17 +185,34 @@ class MusicService:
                     query_kwargs['IndexName'] = index_name
                 if combined_filter_expression:
                     query_kwargs['FilterExpression'] = combined_filter_expression
-                response = table.query(**query_kwargs)
+                query_kwargs.update(projection_kwargs(projection))
+                operation = table.query
             elif combined_filter_expression:
+                # Only a year is left, which no index covers; the snapshot avoids a table scan.
+                snapshot = catalog_snapshot.get() if catalog_snapshot else None
+                if snapshot is not None:
+                    logger.info(f"Year search served from the catalog snapshot")
+                    rows = snapshot.rows_with('year', year_value, limit=SNAPSHOT_SEARCH_LIMIT)
+                    return {'Items': [select_fields(snapshot.row(row), projection) for row in rows]}
                 logger.info(f"Combined expression filtering")
-                scan_kwargs = {
+                query_kwargs = {
                     'FilterExpression': combined_filter_expression
                 }
-                response = table.scan(**scan_kwargs)
-
-            return {
-                'Items': response.get('Items', []),
-            } if response else {'Items': []}
+                query_kwargs.update(projection_kwargs(projection))
+                operation = table.scan
+            else:
+                return {'Items': []}
+
+            # One page (up to 1 MB) unless the caller needs the complete result, e.g. for counts.
+            items = []
+            while True:
+                response = operation(**query_kwargs)
+                items.extend(response.get('Items', []))
+                if not all_pages or 'LastEvaluatedKey' not in response:
+                    break
+                query_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+            return {'Items': items}
 
         except Exception as e:
             logger.error(f"Error during DynamoDB operation: {e}")
@@ -119,15 +226,93 @@ class MusicService:
             album = query_params.get('album', None)
             artist = query_params.get('artist', None)
             year = query_params.get('year', None)
+            compact = query_params.get('format') == COLUMNS_FORMAT
+            try:
+                fields = parse_fields(query_params.get('fields'), SONG_FIELDS)
+            except ValueError as error:
+                logger.warning(f"Invalid fields: {error}")
+                return self._generate_response(400, str(error))
+
             logger.info(f"Query based on title={title} album={album} artist={artist} year={year}")
-            search_response = self._filter_search(music_table, title, artist, year, album)
+            if compact and fields is None:
+                fields = list(SONG_FIELDS)
+            search_response = self._filter_search(music_table, title, artist, year, album, fields)
             logger.info(f"Song fetched after filtering {len(search_response['Items'])}")
+            if compact:
+                return self._generate_response(200, "Search results", to_columns(search_response['Items'], fields))
             return self._generate_response(200, "Search results", search_response)
 
         except Exception as error:
             logger.error(f"Error while filtering the music {str(error)}")
             return self._generate_response(500, "Error while filtering the music")
 
+    def get_song_facets(self):
+        try:
+            logger.info("Getting song facets")
+            query_params = self.event.get('queryStringParameters') or {}
+            title = query_params.get('title', None)
+            album = query_params.get('album', None)
+            artist = query_params.get('artist', None)
+            year = query_params.get('year', None)
+            facet_limit = query_params.get('facet_limit', None)
+            try:
+                facet_limit = int(facet_limit) if facet_limit else None
+            except ValueError:
+                return self._generate_response(400, 'facet_limit must be a number')
+            if facet_limit is not None and facet_limit < 1:
+                return self._generate_response(400, 'facet_limit must be positive')
+
+            try:
+                limit = int(query_params.get('limit', FACETS_PAGE_SIZE))
+            except ValueError:
+                return self._generate_response(400, 'limit must be a number')
+            limit = max(1, min(limit, FACETS_MAX_PAGE_SIZE))
+
+            try:
+                offset = int(decode_cursor(query_params['cursor'])['offset']) if query_params.get('cursor') else 0
+                if offset < 0:
+                    raise ValueError("Negative offset")
+            except (ValueError, KeyError, TypeError) as error:
+                logger.warning(f"Invalid facets cursor: {error}")
+                return self._generate_response(400, 'Invalid cursor')
+
+            if not (title or album or artist or year):
+                logger.info("No filters given, using catalog facets")
+                catalog_facets = load_catalog_facets()
+                if catalog_facets is None:
+                    return self._generate_response(500, "Catalog facets unavailable")
+                return self._generate_response(200, "Catalog facets", {
+                    'Items': [],
+                    'total': catalog_facets.total,
+                    'facets': catalog_facets.to_response(facet_limit)
+                })
+
+            # A year on its own has no index, so counting it would scan the whole table.
+            if not (title or album or artist):
+                logger.warning("Facets requested for a year-only filter")
+                return self._generate_response(400, 'Facets need an artist, title or album filter')
+
+            logger.info(f"Facets based on title={title} album={album} artist={artist} year={year}")
+            # Counts cover every matching song; only one page of the songs is returned.
+            search_response = self._filter_search(music_table, title, artist, year, album, all_pages=True)
+            if search_response is None:
+                return self._generate_response(500, "Error while filtering the music")
+
+            facet_counter = FacetCounter()
+            items = facet_counter.consume(search_response['Items'])
+            logger.info(f"Counted facets over {facet_counter.total} songs")
+            next_offset = offset + limit
+            return self._generate_response(200, "Search results with facets", {
+                'Items': items[offset:next_offset],
+                'cursor': encode_cursor({'offset': next_offset}) if next_offset < len(items) else None,
+                'total': facet_counter.total,
+                'facets': facet_counter.to_response(facet_limit)
+            })
+
+        except Exception as error:
+            logger.error(f"Error while computing facets {str(error)}")
+            return self._generate_response(500, "Error while computing facets")
+
     def get_subscribed_songs(self):
         try:
             query_params = self.event.get('queryStringParameters')
@@ -137,9 +322,23 @@ class MusicService:
                 logger.warning("user_id is missing")
                 return self._generate_response(400, 'user_id is required')
 
+            compact = query_params.get('format') == COLUMNS_FORMAT
+            try:
+                fields = parse_fields(query_params.get('fields'), SONG_FIELDS)
+            except ValueError as error:
+                logger.warning(f"Invalid fields: {error}")
+                return self._generate_response(400, str(error))
+
             logger.info("Request body validation done")
 
-            user_response = users_table.get_item(Key={'email': user_id})
+            # The frontend re-reads this right after subscribe/unsubscribe, which may have run
+            # in another container, so read consistently rather than from the cache.
+            if fields or compact:
+                # Only the subscription list is needed, not the password or profile.
+                user_response = users_table.get_item(Key={'email': user_id}, ConsistentRead=True,
+                                                     **projection_kwargs(['subscription']))
+            else:
+                user_response = users_table.get_item(Key={'email': user_id}, ConsistentRead=True)
             if 'Item' not in user_response:
                 logger.warning(f"User with id {user_id} not found")
                 return self._generate_response(400, 'User not found')
@@ -149,6 +348,13 @@ class MusicService:
             user = user_response['Item']
             subscriptions = user.get('subscription', set())
 
+            if compact:
+                return self._generate_response(
+                    200,
+                    f"Successfully retrieved {len(subscriptions)} subscribed songs",
+                    data=to_columns(subscriptions, fields or list(SONG_FIELDS))
+                )
+
             if not subscriptions:
                 logger.info("No subscribed songs found")
                 return self._generate_response(200, 'No subscribed songs found', data=[])
@@ -156,7 +362,7 @@ class MusicService:
             return self._generate_response(
                 200,
                 f"Successfully retrieved {len(subscriptions)} subscribed songs",
-                data=subscriptions
+                data=[select_fields(subscription, fields) for subscription in subscriptions]
             )
 
         except Exception as error:
@@ -178,21 +384,25 @@ class MusicService:
 
             logger.info("Request body validation")
 
-            user_response = users_table.get_item(Key={'email': user_id})
-            if 'Item' not in user_response:
+            # The user and song lookups are independent, so fetch them in one round trip.
+            lookups = fetch_items(dynamodb, {
+                'user': (users_table, {'email': user_id}),
+                'song': (music_table, {'artist': artist, 'album#title': f"{album}#{title}"})
+            }, retry_controller, consistent=('user',))
+
+            if lookups['user'] is None:
                 logger.warning(f"User with id {user_id} not found")
                 return self._generate_response(400, 'User not found')
 
             logger.info(f"User with id {user_id} found")
 
-            song_response = music_table.get_item(Key={'artist': artist, 'album#title': f"{album}#{title}"})
-            if 'Item' not in song_response:
+            if lookups['song'] is None:
                 logger.warning(f"Song with artist {artist}, album {album}, and title {title} not found")
                 return self._generate_response(404, 'Song not found')
 
             logger.info(f"Song with artist {artist}, album {album}, and title {title} found")
 
-            user = user_response['Item']
+            user = lookups['user']
             subscriptions = user.get('subscription', [])
 
             song_identifier = {'artist': artist, 'album': album, 'title': title, 'year': year, 'img_url': img_url}
@@ -203,18 +413,37 @@ class MusicService:
 
             logger.info("Song not subscribed.")
 
-            users_table.update_item(
-                Key={'email': user_id},
-                UpdateExpression='SET subscription = list_append(if_not_exists(subscription, :empty_list), :song_data)',
-                ExpressionAttributeValues={
-                    ':song_data': [song_identifier],
-                    ':empty_list': []
-                },
-                ReturnValues='UPDATED_NEW'
-            )
+            try:
+                # Append only if the list is still the one the duplicate check ran against.
+                users_table.update_item(
+                    Key={'email': user_id},
+                    UpdateExpression='SET subscription = list_append(if_not_exists(subscription, :empty_list), :song_data)',
+                    ConditionExpression='attribute_not_exists(subscription) OR size(subscription) = :count',
+                    ExpressionAttributeValues={
+                        ':song_data': [song_identifier],
+                        ':empty_list': [],
+                        ':count': len(subscriptions)
+                    },
+                    ReturnValues='UPDATED_NEW'
+                )
+            except ClientError as error:
+                if error.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                logger.warning(f"Subscriptions of user {user_id} changed while subscribing")
+                return self._generate_response(409, 'Subscriptions changed, please retry')
 
             logger.info(f"User {user_id} subscribed to song {artist} - {album} - {title}")
 
+            try:
+                follow_artist(user_id, artist)
+            except Exception as error:
+                logger.error(f"Error following artist {artist} for feed: {error}")
+
+            try:
+                record_subscription(lookups['song'], 1)
+            except Exception as error:
+                logger.error(f"Error counting subscription to {artist} - {album} - {title}: {error}")
+
             return self._generate_response(200, 'Successfully subscribed user to the song')
 
         except Exception as error:
@@ -235,47 +464,124 @@ class MusicService:
 
             logger.info("Request body validation done")
 
-            user_response = users_table.get_item(Key={'email': user_id})
-            if 'Item' not in user_response:
+            # The user and song lookups are independent, so fetch them in one round trip.
+            lookups = fetch_items(dynamodb, {
+                'user': (users_table, {'email': user_id}),
+                'song': (music_table, {'artist': artist, 'album#title': f"{album}#{title}"})
+            }, retry_controller, consistent=('user',))
+
+            if lookups['user'] is None:
                 logger.warning(f"User with id {user_id} not found")
                 return self._generate_response(400, 'User not found')
 
             logger.info(f"User with id {user_id} found")
 
-            song_response = music_table.get_item(Key={'artist': artist, 'album#title': f"{album}#{title}"})
-            if 'Item' not in song_response:
+            if lookups['song'] is None:
                 logger.warning(f"Song with artist {artist}, album {album}, and title {title} not found")
                 return self._generate_response(404, 'Song not found')
 
             logger.info(f"Song with artist {artist}, album {album}, and title {title} found")
 
-            user = user_response['Item']
+            user = lookups['user']
             subscriptions = user.get('subscription', [])
 
             def matches(sub):
                 return sub['artist'] == artist and sub['album'] == album and sub['title'] == title and sub['year'] == year
 
             try:
-                matching_sub = next(sub for sub in subscriptions if matches(sub))
-                subscriptions.remove(matching_sub)
+                index = next(index for index, sub in enumerate(subscriptions) if matches(sub))
 
+                # Remove by position, but only if that entry is still the song that was read.
                 users_table.update_item(
                     Key={'email': user_id},
-                    UpdateExpression='SET subscription = :subscriptions',
-                    ExpressionAttributeValues={':subscriptions': subscriptions},
+                    UpdateExpression=f'REMOVE subscription[{index}]',
+                    ConditionExpression=f'subscription[{index}].artist = :artist AND '
+                                        f'subscription[{index}].album = :album AND '
+                                        f'subscription[{index}].title = :title',
+                    ExpressionAttributeValues={':artist': artist, ':album': album, ':title': title},
                     ReturnValues='UPDATED_NEW'
                 )
                 logger.info(f"User {user_id} unsubscribed from song {artist} - {album} - {title}")
+
+                try:
+                    unfollow_artist(user_id, artist)
+                except Exception as error:
+                    logger.error(f"Error unfollowing artist {artist} for feed: {error}")
+
+                try:
+                    record_subscription(lookups['song'], -1)
+                except Exception as error:
+                    logger.error(f"Error counting unsubscription from {artist} - {album} - {title}: {error}")
+
                 return self._generate_response(200, 'Successfully unsubscribed user from the song')
 
             except StopIteration:
                 logger.info("User is not subscribed to the song")
                 return self._generate_response(400, 'User is not subscribed to the song')
+            except ClientError as error:
+                if error.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                    raise
+                logger.warning(f"Subscriptions of user {user_id} changed while unsubscribing")
+                return self._generate_response(409, 'Subscriptions changed, please retry')
 
         except Exception as error:
             logger.error(f"Error in unsubscribe: {error}")
             return self._generate_response(500, 'Internal server error')
 
+    def get_feed(self):
+        try:
+            query_params = self.event.get('queryStringParameters') or {}
+            user_id = query_params.get('user_id')
+            cursor = query_params.get('cursor')
+
+            if not user_id:
+                logger.warning("user_id is missing")
+                return self._generate_response(400, 'user_id is required')
+
+            try:
+                limit = int(query_params.get('limit', FEED_PAGE_SIZE))
+            except ValueError:
+                return self._generate_response(400, 'limit must be a number')
+            limit = max(1, min(limit, FEED_MAX_PAGE_SIZE))
+
+            try:
+                page = get_feed_page(user_id, limit, cursor)
+            except ValueError as error:
+                logger.warning(f"Invalid feed cursor: {error}")
+                return self._generate_response(400, 'Invalid cursor')
+
+            logger.info(f"Fetched {len(page['Items'])} feed entries for {user_id}")
+            return self._generate_response(200, f"Retrieved {len(page['Items'])} feed entries", page)
+
+        except Exception as error:
+            logger.error(f"Error in get_feed: {error}")
+            return self._generate_response(500, 'Internal server error')
+
+    def get_top_songs(self):
+        try:
+            query_params = self.event.get('queryStringParameters') or {}
+            artist = query_params.get('artist')
+            year = query_params.get('year')
+
+            if artist and year:
+                return self._generate_response(400, 'Use either artist or year, not both')
+
+            try:
+                limit = int(query_params.get('limit', TOP_DEFAULT_LIMIT))
+                year = int(year) if year else None
+            except ValueError:
+                return self._generate_response(400, 'limit and year must be numbers')
+            limit = max(1, min(limit, TOP_VIEW_LENGTH))
+
+            top = get_top(limit, artist=artist, year=year)
+            logger.info(f"Fetched top {len(top['Items'])} songs for artist={artist} year={year}")
+            return self._generate_response(200, f"Top {len(top['Items'])} songs", top)
+
+        except Exception as error:
+            logger.error(f"Error in get_top_songs: {error}")
+            return self._generate_response(500, 'Internal server error')
+
+@profiled
 def lambda_handler(event, context):
     try:
         httpMethod = event.get('httpMethod', '')
@@ -284,15 +590,25 @@ def lambda_handler(event, context):
         raw_body = event.get('body')
         body = json.loads(raw_body) if isinstance(raw_body, str) else {}
         music = MusicService(event, context, body)
+        retry_controller.set_deadline_from_context(context)
+        feed_retry_controller.set_deadline_from_context(context)
+        popularity_retry_controller.set_deadline_from_context(context)
+        logger.info(f"Cache stats: {cache_backend.stats()}, retry stats: {retry_controller.stats()}")
 
         if path == "/search" and httpMethod == 'GET':
             return music.get_songs()
+        elif path == "/search/facets" and httpMethod == 'GET':
+            return music.get_song_facets()
         elif path == "/subscribe" and httpMethod == 'POST':
             return music.subscribe()
         elif path == "/unsubscribe" and httpMethod == 'POST':
             return music.unsubscribe()
         elif path == "/subscribed" and httpMethod == 'GET':
             return music.get_subscribed_songs()
+        elif path == "/feed" and httpMethod == 'GET':
+            return music.get_feed()
+        elif path == "/top" and httpMethod == 'GET':
+            return music.get_top_songs()
         else:
             logger.warning("Invalid action type")
             return {
@@ -0,0 +1,130 @@
+import os
+import time
+import heapq
+import random
+import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+import boto3
+from retry import SDK_RETRY_CONFIG, INTERACTIVE_POLICY, BULK_POLICY, RetryController, RetryingTable
+from search_keys import normalize_search_key
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# The popularity table holds two kinds of items under pk (S) / sk (N):
+#   SONG#<artist>#<album>#<title> / <shard>   subscriber counter shard for a song
+#   TOP#GLOBAL, TOP#ARTIST#<artist_norm>,
+#   TOP#YEAR#<year>                / 0         materialized top list for that scope
+# Writes to one song are spread over COUNTER_SHARDS items so a hot song does not
+# exceed a single item's write throughput.
+POPULARITY_TABLE_NAME = os.environ.get('POPULARITY_TABLE_NAME', 'popularity')
+COUNTER_SHARDS = int(os.environ.get('POPULARITY_COUNTER_SHARDS', 8))
+TOP_VIEW_LENGTH = int(os.environ.get('POPULARITY_TOP_VIEW_LENGTH', 100))
+
+SONG_PREFIX = 'SONG#'
+TOP_PREFIX = 'TOP#'
+
+dynamodb = boto3.resource('dynamodb', config=SDK_RETRY_CONFIG)
+# Counter updates and top reads happen on the music Lambda's request path.
+popularity_retry_controller = RetryController(INTERACTIVE_POLICY)
+popularity_table = RetryingTable(dynamodb.Table(POPULARITY_TABLE_NAME), popularity_retry_controller)
+# Materialization runs on a schedule and can afford to wait for capacity.
+materialize_retry_controller = RetryController(BULK_POLICY)
+materialize_table = RetryingTable(dynamodb.Table(POPULARITY_TABLE_NAME), materialize_retry_controller)
+
+
+def top_view_pk(artist: Optional[str] = None, year: Optional[int] = None) -> str:
+    if artist:
+        return f"{TOP_PREFIX}ARTIST#{normalize_search_key(artist)}"
+    if year is not None:
+        return f"{TOP_PREFIX}YEAR#{int(year)}"
+    return f"{TOP_PREFIX}GLOBAL"
+
+
+def record_subscription(song: Dict[str, Any], delta: int, table=popularity_table):
+    """Atomically add delta to one random shard of the song's subscriber counter."""
+    table.update_item(
+        Key={'pk': f"{SONG_PREFIX}{song['artist']}#{song['album']}#{song['title']}",
+             'sk': random.randrange(COUNTER_SHARDS)},
+        UpdateExpression='ADD subscribers :delta '
+                         'SET artist = if_not_exists(artist, :artist), album = if_not_exists(album, :album), '
+                         'title = if_not_exists(title, :title), #year = if_not_exists(#year, :year), '
+                         'img_url = if_not_exists(img_url, :img_url)',
+        ExpressionAttributeNames={'#year': 'year'},
+        ExpressionAttributeValues={
+            ':delta': delta,
+            ':artist': song['artist'],
+            ':album': song['album'],
+            ':title': song['title'],
+            ':year': int(song['year']),
+            ':img_url': song.get('img_url')
+        }
+    )
+
+
+def get_top(limit: int, artist: Optional[str] = None, year: Optional[int] = None,
+            table=popularity_table) -> Dict[str, Any]:
+    """Read a materialized top list: one GetItem, O(limit) payload."""
+    response = table.get_item(Key={'pk': top_view_pk(artist, year), 'sk': 0})
+    view = response.get('Item')
+    if not view:
+        return {'Items': [], 'updated_at': None}
+    return {'Items': view.get('songs', [])[:limit], 'updated_at': view.get('updated_at')}
+
+
+def materialize_top_views(table=materialize_table, view_length: int = TOP_VIEW_LENGTH) -> int:
+    """Sum the counter shards and rewrite the global, per-artist and per-year top lists.
+
+    Cost is one scan of the counter items (songs with subscribers x shards), never of users.
+    Returns the number of views written.
+    """
+    totals: Dict[str, Dict[str, Any]] = {}
+    stale_views = set()
+    scan_kwargs: Dict[str, Any] = {}
+    while True:
+        response = table.scan(**scan_kwargs)
+        for item in response.get('Items', []):
+            if item['pk'].startswith(TOP_PREFIX):
+                stale_views.add(item['pk'])
+                continue
+            song = totals.setdefault(item['pk'], {
+                'artist': item.get('artist'),
+                'album': item.get('album'),
+                'title': item.get('title'),
+                'year': item.get('year'),
+                'img_url': item.get('img_url'),
+                'subscribers': 0
+            })
+            song['subscribers'] += int(item.get('subscribers', 0))
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    scopes: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for song in totals.values():
+        if song['subscribers'] <= 0:
+            continue
+        scopes[top_view_pk()].append(song)
+        scopes[top_view_pk(artist=song['artist'])].append(song)
+        if song['year'] is not None:
+            scopes[top_view_pk(year=song['year'])].append(song)
+
+    updated_at = int(time.time())
+    with table.batch_writer() as batch:
+        for pk, songs in scopes.items():
+            ranked = heapq.nlargest(view_length, songs, key=lambda s: (s['subscribers'], s['artist'], s['title']))
+            batch.put_item(Item={'pk': pk, 'sk': 0, 'songs': ranked, 'updated_at': updated_at})
+            stale_views.discard(pk)
+        # Scopes whose songs all lost their subscribers.
+        for pk in stale_views:
+            batch.delete_item(Key={'pk': pk, 'sk': 0})
+    logger.info(f"Materialized {len(scopes)} top views from {len(totals)} songs, removed {len(stale_views)}")
+    return len(scopes)
+
+
+def lambda_handler(event, context):
+    """Run on a schedule (e.g. an EventBridge rule every few minutes)."""
+    materialize_retry_controller.set_deadline_from_context(context)
+    views = materialize_top_views()
+    return {'views': views}
@@ -0,0 +1,168 @@
+import io
+import os
+import hmac
+import json
+import time
+import uuid
+import random
+import hashlib
+import logging
+import tarfile
+import cProfile
+import tracemalloc
+from functools import wraps
+from typing import Any, Dict, Optional
+import boto3
+
+logger = logging.getLogger()
+
+# Opt-in per-invocation profiling. With neither variable set, `profiled` returns the
+# handler unchanged and `phase` is a shared no-op, so nothing is measured or traced.
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SECRET = os.environ.get('PROFILE_SECRET', '')
+PROFILE_BUCKET = os.environ.get('PROFILE_BUCKET')
+PROFILE_PREFIX = os.environ.get('PROFILE_PREFIX', 'profiles')
+PROFILE_DIRECTORY = os.environ.get('PROFILE_DIRECTORY', '/tmp')
+# Header value: "<unix timestamp>.<hex HMAC-SHA256 of '<timestamp>:<path>' keyed with PROFILE_SECRET>"
+PROFILE_HEADER = 'x-profile'
+PROFILE_SIGNATURE_MAX_AGE = 300
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 25
+
+# Seconds spent per phase in the invocation being profiled; None when not profiling.
+_phases: Optional[Dict[str, float]] = None
+
+
+class _NullPhase:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class _Phase:
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if _phases is not None:
+            _phases[self.name] = _phases.get(self.name, 0.0) + time.perf_counter() - self.started
+        return False
+
+
+def phase(name: str):
+    """Time a block (e.g. 'dynamodb', 'serialization') when the invocation is profiled."""
+    return _NULL_PHASE if _phases is None else _Phase(name)
+
+
+def sign_profile_request(path: str, secret: str = PROFILE_SECRET, timestamp: Optional[int] = None) -> str:
+    """Header value that enables profiling of one request to `path`."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    signature = hmac.new(secret.encode(), f"{timestamp}:{path}".encode(), hashlib.sha256).hexdigest()
+    return f"{timestamp}.{signature}"
+
+
+def _has_valid_signature(event: Dict[str, Any]) -> bool:
+    if not PROFILE_SECRET:
+        return False
+    headers = {name.lower(): value for name, value in (event.get('headers') or {}).items()}
+    value = headers.get(PROFILE_HEADER)
+    if not value:
+        return False
+    timestamp, _, _ = value.partition('.')
+    if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > PROFILE_SIGNATURE_MAX_AGE:
+        logger.warning("Rejected expired profiling header")
+        return False
+    expected = sign_profile_request(event.get('path') or '', PROFILE_SECRET, int(timestamp))
+    if not hmac.compare_digest(value, expected):
+        logger.warning("Rejected profiling header with a bad signature")
+        return False
+    return True
+
+
+def _build_artifact(profiler: cProfile.Profile, summary: Dict[str, Any]) -> bytes:
+    """gzip'd tar of `profile.prof` (pstats) and `summary.json` (phases, allocations)."""
+    profile_path = os.path.join(PROFILE_DIRECTORY, f"profile-{os.getpid()}.prof")
+    profiler.dump_stats(profile_path)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        archive.add(profile_path, arcname='profile.prof')
+        summary_bytes = json.dumps(summary, indent=2).encode('utf-8')
+        info = tarfile.TarInfo('summary.json')
+        info.size = len(summary_bytes)
+        info.mtime = int(time.time())
+        archive.addfile(info, io.BytesIO(summary_bytes))
+    os.remove(profile_path)
+    return buffer.getvalue()
+
+
+def _store_artifact(artifact: bytes, context) -> str:
+    name = f"{int(time.time())}-{getattr(context, 'aws_request_id', uuid.uuid4().hex)}.tar.gz"
+    function_name = getattr(context, 'function_name', 'local')
+    if PROFILE_BUCKET:
+        key = f"{PROFILE_PREFIX}/{function_name}/{name}"
+        boto3.client('s3').put_object(Bucket=PROFILE_BUCKET, Key=key, Body=artifact,
+                                      ContentType='application/gzip')
+        return f"s3://{PROFILE_BUCKET}/{key}"
+    path = os.path.join(PROFILE_DIRECTORY, name)
+    with open(path, 'wb') as file:
+        file.write(artifact)
+    return path
+
+
+def profiled(handler):
+    """Wrap a Lambda handler so that sampled or signed invocations are profiled."""
+    if not PROFILE_SAMPLE_RATE and not PROFILE_SECRET:
+        return handler
+
+    @wraps(handler)
+    def wrapper(event, context):
+        global _phases
+        sampled = PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE
+        if not (sampled or _has_valid_signature(event)):
+            return handler(event, context)
+
+        _phases = {}
+        profiler = cProfile.Profile()
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            return handler(event, context)
+        finally:
+            profiler.disable()
+            total = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            phases, _phases = _phases, None
+            try:
+                summary = {
+                    'path': event.get('path'),
+                    'method': event.get('httpMethod'),
+                    'trigger': 'sampled' if sampled else 'header',
+                    'total_seconds': total,
+                    'phases': dict(phases, business_logic=max(0.0, total - sum(phases.values()))),
+                    'memory': {'current_bytes': current, 'peak_bytes': peak},
+                    'top_allocations': [
+                        {'location': str(stat.traceback[0]), 'size_bytes': stat.size, 'count': stat.count}
+                        for stat in snapshot.statistics('lineno')[:TRACEMALLOC_TOP]
+                    ]
+                }
+                location = _store_artifact(_build_artifact(profiler, summary), context)
+                logger.info(f"Profile written to {location}: {summary['phases']}")
+            except Exception as error:
+                logger.error(f"Error writing profile: {error}")
+
+    return wrapper
@@ -0,0 +1,218 @@
+import time
+import random
+import logging
+from contextlib import nullcontext
+from threading import Lock
+from typing import Any, Callable, ContextManager, Dict, Optional
+from boto3.dynamodb.table import BatchWriter
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionClosedError, EndpointConnectionError, ReadTimeoutError
+
+logger = logging.getLogger()
+
+# Retries are owned by RetryController; leaving the SDK's own retries on would multiply attempts.
+SDK_RETRY_CONFIG = Config(retries={'mode': 'standard', 'total_max_attempts': 1})
+
+THROTTLE_ERROR_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+}
+RETRYABLE_ERROR_CODES = THROTTLE_ERROR_CODES | {
+    'InternalServerError',
+    'ServiceUnavailable',
+}
+RETRYABLE_EXCEPTIONS = (ConnectionClosedError, EndpointConnectionError, ReadTimeoutError)
+
+
+class RetryDeadlineExceeded(Exception):
+    """No time left in the invocation to wait for capacity."""
+
+
+class RetryPolicy:
+
+    def __init__(
+            self,
+            name: str,
+            max_attempts: int,
+            base_delay: float,
+            max_delay: float,
+            initial_rate: float,
+            max_rate: float,
+            min_rate: float = 1.0,
+            deadline_margin: float = 0.0
+    ):
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.initial_rate = initial_rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        # Seconds kept free before the Lambda timeout so a response can still be returned.
+        self.deadline_margin = deadline_margin
+
+
+# Request paths: give up quickly and never eat into the time needed to respond.
+INTERACTIVE_POLICY = RetryPolicy('interactive', max_attempts=4, base_delay=0.025, max_delay=0.5,
+                                 initial_rate=200.0, max_rate=1000.0, min_rate=10.0, deadline_margin=0.5)
+# Loaders and migrations: patient, and slow down hard when the table pushes back.
+BULK_POLICY = RetryPolicy('bulk', max_attempts=10, base_delay=0.1, max_delay=20.0,
+                          initial_rate=50.0, max_rate=5000.0, min_rate=1.0)
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose refill rate halves on throttling and grows linearly on success."""
+
+    def __init__(self, rate: float, max_rate: float, min_rate: float):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.tokens = 1.0
+        self._updated = time.monotonic()
+        self._lock = Lock()
+
+    def _refill(self, now: float):
+        # Capacity of one second's worth of tokens allows short bursts.
+        self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take a token, waiting for one if needed. False if that would pass the deadline."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return True
+                wait = (1.0 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def on_throttle(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+def _no_phase(name: str) -> ContextManager:
+    return _NULL_CONTEXT
+
+
+class RetryController:
+    """Runs DynamoDB calls through the rate limiter with jittered, deadline-aware retries."""
+
+    def __init__(self, policy: RetryPolicy, phase: Optional[Callable[[str], ContextManager]] = None):
+        self.policy = policy
+        # Wraps time spent on DynamoDB (calls and backoff), e.g. profiling.phase in the Lambdas.
+        self.phase = phase or _no_phase
+        self.bucket = AdaptiveTokenBucket(policy.initial_rate, policy.max_rate, policy.min_rate)
+        self._deadline: Optional[float] = None
+        self._counters = {'calls': 0, 'retries': 0, 'throttles': 0, 'give_ups': 0}
+        self._lock = Lock()
+
+    def set_deadline_from_context(self, context):
+        """Bound retries by the Lambda's remaining time; no context means no deadline."""
+        remaining = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining is None:
+            self._deadline = None
+        else:
+            self._deadline = time.monotonic() + remaining() / 1000 - self.policy.deadline_margin
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._counters, rate=round(self.bucket.rate, 1))
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform over [0, min(cap, base * 2^attempt)].
+        return random.uniform(0, min(self.policy.max_delay, self.policy.base_delay * (2 ** attempt)))
+
+    def call(self, operation: Callable, *args, **kwargs):
+        self._count('calls')
+        with self.phase('dynamodb'):
+            attempt = 0
+            while True:
+                if not self.bucket.acquire(self._deadline):
+                    self._count('give_ups')
+                    raise RetryDeadlineExceeded(f"No DynamoDB capacity before the {self.policy.name} deadline")
+                try:
+                    result = operation(*args, **kwargs)
+                    self.bucket.on_success()
+                    return result
+                except ClientError as error:
+                    code = error.response.get('Error', {}).get('Code')
+                    if code not in RETRYABLE_ERROR_CODES:
+                        raise
+                    if code in THROTTLE_ERROR_CODES:
+                        self._count('throttles')
+                        self.bucket.on_throttle()
+                    self._wait_or_raise(attempt, error)
+                except RETRYABLE_EXCEPTIONS as error:
+                    self._wait_or_raise(attempt, error)
+                attempt += 1
+
+    def pause(self, attempt: int):
+        """Back off before re-requesting partial results (e.g. UnprocessedKeys)."""
+        delay = self._backoff(attempt)
+        if attempt >= self.policy.max_attempts or (
+                self._deadline is not None and time.monotonic() + delay > self._deadline):
+            self._count('give_ups')
+            raise RetryDeadlineExceeded(f"Gave up waiting for unprocessed items after {attempt} attempts")
+        self._count('retries')
+        with self.phase('dynamodb'):
+            time.sleep(delay)
+
+    def _wait_or_raise(self, attempt: int, error: Exception):
+        delay = self._backoff(attempt)
+        out_of_time = self._deadline is not None and time.monotonic() + delay > self._deadline
+        if attempt + 1 >= self.policy.max_attempts or out_of_time:
+            self._count('give_ups')
+            raise error
+        logger.warning(f"Retrying DynamoDB call after {error}, attempt {attempt + 1}, sleeping {delay:.3f}s")
+        self._count('retries')
+        time.sleep(delay)
+
+
+class _RetryingClient:
+    """Just enough of a client for BatchWriter, routing batch_write_item through the controller."""
+
+    def __init__(self, client, controller: RetryController):
+        self._client = client
+        self._controller = controller
+
+    def batch_write_item(self, **kwargs):
+        return self._controller.call(self._client.batch_write_item, **kwargs)
+
+
+class RetryingTable:
+    """Wraps a boto3 Table so data-plane calls go through a RetryController."""
+
+    RETRIED_METHODS = ('get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan')
+
+    def __init__(self, table, controller: RetryController):
+        self.table = table
+        self.controller = controller
+
+    def __getattr__(self, name):
+        attribute = getattr(self.table, name)
+        if name in self.RETRIED_METHODS:
+            return lambda *args, **kwargs: self.controller.call(attribute, *args, **kwargs)
+        return attribute
+
+    def batch_writer(self, overwrite_by_pkeys=None):
+        return BatchWriter(self.table.name, _RetryingClient(self.table.meta.client, self.controller),
+                           overwrite_by_pkeys=overwrite_by_pkeys)
@@ -0,0 +1,30 @@
+import re
+import unicodedata
+from typing import Dict
+
+# Normalized copies of the searchable attributes, written alongside the originals and
+# indexed by the GSIs below, so case/accent-insensitive search is a keyed query.
+SEARCH_KEY_ATTRIBUTES = {'artist': 'artist_norm', 'album': 'album_norm', 'title': 'title_norm'}
+
+ARTIST_NORM_YEAR_INDEX = 'ArtistNormYearIndex'
+TITLE_NORM_ALBUM_INDEX = 'TitleNormAlbumIndex'
+ALBUM_NORM_INDEX = 'AlbumNormIndex'
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_search_key(value: str) -> str:
+    """Lowercase, strip accents and collapse whitespace: "  Beyoncé  Knowles" -> "beyonce knowles"."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    stripped = ''.join(character for character in decomposed if not unicodedata.combining(character))
+    return _WHITESPACE.sub(' ', stripped.casefold()).strip()
+
+
+def search_key_attributes(item: Dict[str, str]) -> Dict[str, str]:
+    """Normalized attributes for a music item; DynamoDB rejects empty key strings, so skip those."""
+    attributes = {}
+    for source, target in SEARCH_KEY_ATTRIBUTES.items():
+        value = normalize_search_key(item.get(source) or '')
+        if value:
+            attributes[target] = value
+    return attributes
@@ -0,0 +1,292 @@
+import json
+import mmap
+import os
+import sys
+import time
+import logging
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from botocore.exceptions import ClientError
+
+logger = logging.getLogger()
+
+# Columnar catalog snapshot.
+#
+#   b"MUSNAP01" | uint32 directory length | directory (JSON) | 8-byte aligned sections
+#
+# The directory lists every column and the absolute offset/length of its sections.
+# String columns are interned: a uint32 code per row plus a dictionary stored as
+# uint32 offsets (n + 1) into a UTF-8 blob. Integer columns are int32 per row.
+# All integers are little-endian.
+
+SNAPSHOT_MAGIC = b"MUSNAP01"
+STRING_COLUMNS: Tuple[str, ...] = ('artist', 'album', 'title', 'img_url')
+INT_COLUMNS: Tuple[str, ...] = ('year',)
+
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def _to_le_bytes(values: array) -> bytes:
+    if not _LITTLE_ENDIAN:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _pad(length: int) -> int:
+    return (8 - length % 8) % 8
+
+
+class SnapshotWriter:
+    """Builds a snapshot incrementally; strings are interned as items are added."""
+
+    def __init__(
+            self,
+            string_columns: Tuple[str, ...] = STRING_COLUMNS,
+            int_columns: Tuple[str, ...] = INT_COLUMNS
+    ):
+        self.string_columns = string_columns
+        self.int_columns = int_columns
+        self.row_count = 0
+        self._codes: Dict[str, array] = {column: array('I') for column in string_columns}
+        self._interned: Dict[str, Dict[str, int]] = {column: {} for column in string_columns}
+        self._ints: Dict[str, array] = {column: array('i') for column in int_columns}
+
+    def add(self, item: Dict[str, Any]):
+        for column in self.string_columns:
+            value = item.get(column) or ''
+            interned = self._interned[column]
+            code = interned.get(value)
+            if code is None:
+                code = interned[value] = len(interned)
+            self._codes[column].append(code)
+        for column in self.int_columns:
+            value = item.get(column)
+            self._ints[column].append(int(value) if value not in (None, '') else 0)
+        self.row_count += 1
+
+    def _sections(self) -> List[Tuple[str, str, bytes]]:
+        sections = []
+        for column in self.string_columns:
+            offsets = array('I', [0])
+            blob = bytearray()
+            # Dict preserves insertion order, which is the code order.
+            for value in self._interned[column]:
+                blob += value.encode('utf-8')
+                offsets.append(len(blob))
+            sections.append((column, 'codes', _to_le_bytes(self._codes[column])))
+            sections.append((column, 'offsets', _to_le_bytes(offsets)))
+            sections.append((column, 'strings', bytes(blob)))
+        for column in self.int_columns:
+            sections.append((column, 'values', _to_le_bytes(self._ints[column])))
+        return sections
+
+    def to_bytes(self) -> bytes:
+        sections = self._sections()
+
+        # The directory holds absolute offsets, which depend on the directory's own size,
+        # so lay it out until its length is stable.
+        directory_length = 0
+        while True:
+            position = len(SNAPSHOT_MAGIC) + 4 + directory_length
+            position += _pad(position)
+            columns: Dict[str, Dict[str, Any]] = {}
+            for column, section, data in sections:
+                entry = columns.setdefault(column, {
+                    'type': 'str' if column in self.string_columns else 'int'})
+                entry[section] = [position, len(data)]
+                position += len(data) + _pad(len(data))
+            directory = json.dumps({'rows': self.row_count, 'columns': columns},
+                                   separators=(',', ':')).encode('utf-8')
+            if len(directory) == directory_length:
+                break
+            directory_length = len(directory)
+
+        output = bytearray(SNAPSHOT_MAGIC)
+        output += directory_length.to_bytes(4, 'little')
+        output += directory
+        output += b'\0' * _pad(len(output))
+        for _, _, data in sections:
+            output += data
+            output += b'\0' * _pad(len(data))
+        return bytes(output)
+
+    def write(self, path: str):
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+
+def download_if_changed(s3_client, bucket: str, key: str, local_path: str) -> bool:
+    """Download the object unless the local copy has the same ETag. Returns True if downloaded."""
+    etag_path = f"{local_path}.etag"
+    get_kwargs = {'Bucket': bucket, 'Key': key}
+    if os.path.exists(local_path) and os.path.exists(etag_path):
+        with open(etag_path) as etag_file:
+            get_kwargs['IfNoneMatch'] = etag_file.read()
+    try:
+        response = s3_client.get_object(**get_kwargs)
+    except ClientError as error:
+        if error.response.get('Error', {}).get('Code') in ('304', 'NotModified'):
+            return False
+        raise
+    temporary_path = f"{local_path}.part"
+    with open(temporary_path, 'wb') as file:
+        for chunk in response['Body'].iter_chunks(1 << 20):
+            file.write(chunk)
+    os.replace(temporary_path, local_path)
+    with open(etag_path, 'w') as etag_file:
+        etag_file.write(response['ETag'])
+    return True
+
+
+class CatalogSnapshot:
+    """Read-only view over a snapshot buffer (bytes or mmap).
+
+    Column arrays are memoryviews into the buffer, so opening a snapshot copies nothing;
+    strings are decoded on first access and kept per dictionary code.
+    """
+
+    def __init__(self, buffer, _file=None):
+        self._buffer = buffer
+        self._file = _file
+        view = memoryview(buffer)
+        if bytes(view[:len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+            raise ValueError("Not a catalog snapshot")
+        start = len(SNAPSHOT_MAGIC)
+        directory_length = int.from_bytes(view[start:start + 4], 'little')
+        directory = json.loads(bytes(view[start + 4:start + 4 + directory_length]))
+        self.row_count: int = directory['rows']
+        self.columns: Dict[str, Dict[str, Any]] = directory['columns']
+        self._view = view
+        self._arrays: Dict[Tuple[str, str], Any] = {}
+        self._decoded: Dict[str, List[Optional[str]]] = {}
+
+    @classmethod
+    def open(cls, path: str) -> "CatalogSnapshot":
+        file = open(path, 'rb')
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            file.close()
+            raise
+        return cls(buffer, _file=file)
+
+    @classmethod
+    def from_s3(cls, s3_client, bucket: str, key: str, local_path: str = '/tmp/catalog.snap') -> "CatalogSnapshot":
+        """Map the snapshot from Lambda /tmp, downloading it first if S3 has a different version."""
+        download_if_changed(s3_client, bucket, key, local_path)
+        return cls.open(local_path)
+
+    def close(self):
+        # The mmap can only be closed once every view exported from it is released.
+        for values in self._arrays.values():
+            if isinstance(values, memoryview):
+                values.release()
+        self._arrays.clear()
+        self._view.release()
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    def _section(self, column: str, section: str, typecode: str):
+        values = self._arrays.get((column, section))
+        if values is None:
+            offset, length = self.columns[column][section]
+            raw = self._view[offset:offset + length]
+            if _LITTLE_ENDIAN:
+                values = raw.cast(typecode)
+            else:
+                values = array(typecode, raw)
+                values.byteswap()
+            self._arrays[(column, section)] = values
+        return values
+
+    def codes(self, column: str):
+        """uint32 dictionary code per row for a string column."""
+        return self._section(column, 'codes', 'I')
+
+    def ints(self, column: str):
+        """int32 value per row for an integer column."""
+        return self._section(column, 'values', 'i')
+
+    def dictionary_size(self, column: str) -> int:
+        return self.columns[column]['offsets'][1] // 4 - 1
+
+    def string(self, column: str, code: int) -> str:
+        decoded = self._decoded.get(column)
+        if decoded is None:
+            decoded = self._decoded[column] = [None] * self.dictionary_size(column)
+        value = decoded[code]
+        if value is None:
+            offsets = self._section(column, 'offsets', 'I')
+            blob_offset = self.columns[column]['strings'][0]
+            value = decoded[code] = str(
+                self._view[blob_offset + offsets[code]:blob_offset + offsets[code + 1]], 'utf-8')
+        return value
+
+    def value(self, column: str, row: int) -> Any:
+        if self.columns[column]['type'] == 'int':
+            return self.ints(column)[row]
+        return self.string(column, self.codes(column)[row])
+
+    def rows_with(self, column: str, value: int, limit: Optional[int] = None) -> List[int]:
+        """Rows whose integer column equals value, read straight from the mapped column."""
+        values = self.ints(column)
+        rows = []
+        for row in range(self.row_count):
+            if values[row] == value:
+                rows.append(row)
+                if limit is not None and len(rows) >= limit:
+                    break
+        return rows
+
+    def row(self, row: int) -> Dict[str, Any]:
+        item = {column: self.value(column, row) for column in self.columns}
+        if 'album' in item and 'title' in item:
+            item['album#title'] = f"{item['album']}#{item['title']}"
+        return item
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for row in range(self.row_count):
+            yield self.row(row)
+
+
+class SnapshotCache:
+    """Keeps the latest snapshot from S3 mapped for the life of a container.
+
+    S3 is asked for a newer version (a conditional GET) at most every `check_interval`
+    seconds, so re-running scripts/catalog_snapshot.py reaches warm containers.
+    """
+
+    def __init__(self, s3_client, bucket: str, key: str, local_path: str = '/tmp/catalog.snap',
+                 check_interval: float = 300):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.key = key
+        self.local_path = local_path
+        self.check_interval = check_interval
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._next_check = 0.0
+
+    def get(self) -> Optional[CatalogSnapshot]:
+        """The current snapshot, or None if it could never be loaded."""
+        now = time.monotonic()
+        if self._snapshot is not None and now < self._next_check:
+            return self._snapshot
+        # Failures are retried on the next interval too, not on every request.
+        self._next_check = now + self.check_interval
+        try:
+            changed = download_if_changed(self.s3_client, self.bucket, self.key, self.local_path)
+            if changed or self._snapshot is None:
+                previous, self._snapshot = self._snapshot, CatalogSnapshot.open(self.local_path)
+                logger.info(f"Loaded catalog snapshot s3://{self.bucket}/{self.key} "
+                            f"({self._snapshot.row_count} songs)")
+                if previous is not None:
+                    previous.close()
+        except Exception as error:
+            logger.error(f"Error refreshing catalog snapshot: {error}")
+        return self._snapshot
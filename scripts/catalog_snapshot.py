@@ -0,0 +1,88 @@
+import os
+import sys
+import time
+import argparse
+import boto3
+
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from snapshot import SnapshotWriter, CatalogSnapshot
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+
+AWS_REGION = "us-east-1"
+MUSIC_TABLE_NAME = "music"
+
+# S3 location the Lambdas load the snapshot from
+S3_BUCKET_NAME = "a1-project-group-31"
+SNAPSHOT_KEY = "catalog/music.snap"
+SNAPSHOT_FILE_NAME = "./music.snap"
+
+
+def export_music_snapshot(region_name: str = AWS_REGION) -> SnapshotWriter:
+    """Scan the music table page by page, interning strings as items arrive."""
+    try:
+        dynamodb = boto3.resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
+        table = RetryingTable(dynamodb.Table(MUSIC_TABLE_NAME), RetryController(BULK_POLICY))
+        writer = SnapshotWriter()
+        scan_kwargs = {
+            'ProjectionExpression': '#artist, #album, #title, #year, #img_url',
+            'ExpressionAttributeNames': {
+                '#artist': 'artist', '#album': 'album', '#title': 'title',
+                '#year': 'year', '#img_url': 'img_url'
+            }
+        }
+
+        print(f"INFO: Scanning DynamoDB table '{MUSIC_TABLE_NAME}'")
+        while True:
+            response = table.scan(**scan_kwargs)
+            for item in response.get('Items', []):
+                writer.add(item)
+            print(f"INFO: Scanned {writer.row_count} songs")
+            if 'LastEvaluatedKey' not in response:
+                break
+            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+        print(f"SUCCESS: Collected {writer.row_count} songs for the snapshot")
+        return writer
+    except Exception as e:
+        print(f"ERROR: Failed to export music table: {str(e)}")
+        raise e
+
+
+def write_snapshot(writer: SnapshotWriter, file_name: str):
+    try:
+        writer.write(file_name)
+        started = time.perf_counter()
+        snapshot = CatalogSnapshot.open(file_name)
+        rows = len(snapshot)
+        snapshot.close()
+        print(f"SUCCESS: Wrote {rows} songs ({os.path.getsize(file_name)} bytes) to '{file_name}', "
+              f"verified load in {(time.perf_counter() - started) * 1000:.2f} ms")
+    except Exception as e:
+        print(f"ERROR: Failed to write snapshot '{file_name}': {str(e)}")
+        raise e
+
+
+def upload_snapshot(file_name: str, bucket_name: str, region_name: str):
+    try:
+        s3 = boto3.client("s3", region_name=region_name)
+        s3.upload_file(file_name, bucket_name, SNAPSHOT_KEY)
+        print(f"SUCCESS: Uploaded snapshot to s3://{bucket_name}/{SNAPSHOT_KEY}")
+    except Exception as e:
+        print(f"ERROR: Failed to upload snapshot: {str(e)}")
+        raise e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the music table to a columnar snapshot")
+    parser.add_argument("--output", default=SNAPSHOT_FILE_NAME, help="Local snapshot path")
+    parser.add_argument("--local-only", action="store_true", help="Skip the S3 upload")
+    args = parser.parse_args()
+
+    try:
+        snapshot_writer = export_music_snapshot()
+        write_snapshot(snapshot_writer, args.output)
+        if not args.local_only:
+            upload_snapshot(args.output, S3_BUCKET_NAME, AWS_REGION)
+    except Exception as e:
+        print(f"ERROR: Failed in main execution: {str(e)}")
@@ -0,0 +1,103 @@
+import os
+import sys
+import argparse
+from collections import Counter
+import boto3
+from botocore.exceptions import ClientError
+
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+
+AWS_REGION = "us-east-1"
+FEED_TABLE_NAME = "feed"
+USER_TABLE_NAME = "users"
+
+class FeedDynamoDBOperations:
+
+    def __init__(self, region_name: str = AWS_REGION):
+        self.dynamodb = boto3.resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
+        self.table_name = FEED_TABLE_NAME
+        self.table = None
+        self.retry_controller = RetryController(BULK_POLICY)
+
+    def table_exists(self):
+        """Check if the table already exists."""
+        try:
+            table = self.dynamodb.Table(self.table_name)
+            table.load()
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ResourceNotFoundException':
+                return False
+            raise
+
+    def create_table(self):
+        """Create the feed table (artist follow edges and per-user feed entries)."""
+        try:
+            if self.table_exists():
+                print(f"INFO: Table '{self.table_name}' already exists, using existing table")
+                self.table = self.dynamodb.Table(self.table_name)
+                return self.table
+
+            print(f"INFO: Creating DynamoDB table '{FEED_TABLE_NAME}'")
+            self.table = self.dynamodb.create_table(
+                TableName=self.table_name,
+                KeySchema=[
+                    # ARTIST#<artist> or FEED#<email>
+                    {'AttributeName': 'pk', 'KeyType': 'HASH'},
+                    # USER#<email> or <timestamp>#<song key>
+                    {'AttributeName': 'sk', 'KeyType': 'RANGE'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'pk', 'AttributeType': 'S'},
+                    {'AttributeName': 'sk', 'AttributeType': 'S'},
+                ],
+                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+            )
+            self.table.wait_until_exists()
+            print(f"SUCCESS: DynamoDB table created successfully: {self.table.item_count}")
+            return self.table
+        except Exception as e:
+            print(f"ERROR: Failed to create DynamoDB table: {str(e)}")
+            raise e
+
+    def seed_from_users(self):
+        """One-off: create follow edges for subscriptions made before the feed existed."""
+        try:
+            users = RetryingTable(self.dynamodb.Table(USER_TABLE_NAME), self.retry_controller)
+            table = RetryingTable(self.dynamodb.Table(self.table_name), self.retry_controller)
+            # (artist, email) -> subscribed songs by that artist, the edge's `songs` counter
+            edges = Counter()
+            scan_kwargs = {'ProjectionExpression': 'email, subscription'}
+            while True:
+                response = users.scan(**scan_kwargs)
+                for user in response.get('Items', []):
+                    for song in user.get('subscription', []):
+                        edges[(song['artist'], user['email'])] += 1
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+            # Edges are overwritten with the current count, so re-running is safe.
+            with table.batch_writer() as batch:
+                for (artist, email), songs in edges.items():
+                    batch.put_item(Item={'pk': f"ARTIST#{artist}", 'sk': f"USER#{email}", 'songs': songs})
+            print(f"SUCCESS: Seeded {len(edges)} artist follow edges")
+        except Exception as e:
+            print(f"ERROR: Failed to seed follow edges: {str(e)}")
+            raise e
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the feed table")
+    parser.add_argument("--seed-from-users", action="store_true",
+                        help="Create follow edges from existing subscriptions (scans the users table once)")
+    args = parser.parse_args()
+
+    try:
+        feed_dynamo_db_ops = FeedDynamoDBOperations()
+        feed_dynamo_db_ops.create_table()
+        if args.seed_from_users:
+            feed_dynamo_db_ops.seed_from_users()
+    except Exception as e:
+        print(f"ERROR: Failed in main execution: {str(e)}")
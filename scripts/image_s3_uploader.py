@@ -1,3 +1,5 @@
+import os
+import sys
 import boto3
 import requests
 import json
@@ -5,6 +7,10 @@ from uuid import uuid4
 from typing import Dict
 from music_dynamo_table import MusicDynamoDBOperations, MusicItem
 
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from facets import FacetCounter
+
 # AWS S3 Bucket Configuration
 S3_BUCKET_NAME = "a1-project-group-31"
 AWS_REGION = "us-east-1"
@@ -12,6 +18,9 @@ AWS_REGION = "us-east-1"
 # JSON FILE
 SONG_JSON_FILE_NAME = "./2025a1.json"
 
+# Catalog-wide facet counts read by the music Lambda's /search/facets route
+FACETS_KEY = "catalog/facets.json"
+
 
 def create_public_s3_bucket(bucket_name: str, region_name: str):
     try:
@@ -97,6 +106,22 @@ def upload_image_to_s3_bucket(
         raise e
 
 
+def upload_catalog_facets(bucket_name: str, region_name: str, facet_counter: FacetCounter):
+    try:
+        s3 = boto3.client("s3", region_name=region_name)
+        artifact = facet_counter.to_artifact()
+        s3.put_object(
+            Bucket=bucket_name,
+            Key=FACETS_KEY,
+            Body=artifact,
+            ContentType="application/json",
+        )
+        print(f"SUCCESS: Uploaded catalog facets ({facet_counter.total} songs, {len(artifact)} bytes) to '{FACETS_KEY}'")
+    except Exception as e:
+        print(f"ERROR: Failed to upload catalog facets: {str(e)}")
+        raise e
+
+
 def process_songs_json():
     try:
         songs_data = {}
@@ -110,6 +135,7 @@ def process_songs_json():
         print("SUCCESS: Music file parsed successfully. Found {} songs.".format(
             len(songs_data.get('songs', []))))
         processed_url = set()
+        facet_counter = FacetCounter()
 
         for song_index, song_data in enumerate(songs_data.get('songs', []), start=1):
             print(
@@ -162,6 +188,7 @@ def process_songs_json():
 
                 try:
                     music_dynamo_db_ops.insert_music_data(song)
+                    facet_counter.add({'artist': song.artist, 'album': song.album, 'year': song.year})
                     print(
                         f"SUCCESS: Song data inserted into DynamoDB for: {song.title}")
                 except Exception as e:
@@ -173,6 +200,8 @@ def process_songs_json():
                 print(
                     f"INFO: Skipping duplicate song: {song.title} by {song.artist}, album: {song.album}")
 
+        upload_catalog_facets(S3_BUCKET_NAME, AWS_REGION, facet_counter)
+
     except FileNotFoundError:
         print(f"ERROR: Music JSON file not found at {SONG_JSON_FILE_NAME}")
         raise
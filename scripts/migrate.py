@@ -0,0 +1,324 @@
+import os
+import sys
+import json
+import time
+import argparse
+import importlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+from search_keys import search_key_attributes
+
+AWS_REGION = "us-east-1"
+
+DEFAULT_SEGMENTS = 8
+DEFAULT_PAGE_SIZE = 100
+# TransactWriteItems accepts up to 100 actions; smaller batches conflict less often.
+DEFAULT_BATCH_SIZE = 25
+
+# Returned as an attribute value by a transform to delete that attribute.
+REMOVE = object()
+
+# A transform receives an item and returns {attribute: new value or REMOVE}, or None to skip it.
+Transform = Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def music_search_keys(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Write the normalized search keys used by /search (see Lambda/search_keys.py)."""
+    changes = {name: value for name, value in search_key_attributes(item).items() if item.get(name) != value}
+    return changes or None
+
+
+# Transforms that can be named on the command line; anything else is `module:function`.
+TRANSFORMS: Dict[str, Transform] = {
+    'music-search-keys': music_search_keys,
+}
+
+
+class CapacityLimiter:
+    """Keeps consumed capacity units per second under a budget. Shared by all segments."""
+
+    def __init__(self, units_per_second: Optional[float]):
+        self.units_per_second = units_per_second
+        self._available = units_per_second or 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, units: float):
+        """Charge units already spent; sleep while the budget is in debt."""
+        if not self.units_per_second:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.units_per_second,
+                                  self._available + (now - self._updated) * self.units_per_second)
+            self._updated = now
+            self._available -= units
+            debt = -self._available
+        if debt > 0:
+            time.sleep(debt / self.units_per_second)
+
+
+class MigrationEngine:
+    """Rewrites a table online: segmented parallel scan, transform, batched conditional updates.
+
+    Updates only touch the attributes a transform returns, so concurrent application writes to
+    other attributes survive. Each update is conditioned on the item still existing and on the
+    `guard_attributes` still holding the values that were read.
+    """
+
+    def __init__(
+            self,
+            table_name: str,
+            transform: Transform,
+            segments: int = DEFAULT_SEGMENTS,
+            read_capacity_per_second: Optional[float] = None,
+            write_capacity_per_second: Optional[float] = None,
+            checkpoint_file: Optional[str] = None,
+            guard_attributes: Optional[List[str]] = None,
+            dry_run: bool = False,
+            page_size: int = DEFAULT_PAGE_SIZE,
+            batch_size: int = DEFAULT_BATCH_SIZE,
+            region_name: str = AWS_REGION
+    ):
+        self.table_name = table_name
+        self.transform = transform
+        self.segments = segments
+        self.read_limiter = CapacityLimiter(read_capacity_per_second)
+        self.write_limiter = CapacityLimiter(write_capacity_per_second)
+        self.checkpoint_file = checkpoint_file
+        self.guard_attributes = guard_attributes or []
+        self.dry_run = dry_run
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.region_name = region_name
+        self.retry_controller = RetryController(BULK_POLICY)
+        self._lock = threading.Lock()
+        self._checkpoint: Dict[str, Any] = {}
+
+        client = boto3.client('dynamodb', region_name=region_name)
+        key_schema = client.describe_table(TableName=table_name)['Table']['KeySchema']
+        self.key_attributes = [key['AttributeName'] for key in key_schema]
+
+    # Checkpoints
+
+    def _load_checkpoint(self):
+        segments = {str(segment): {'done': False, 'last_key': None,
+                                   'counters': {'scanned': 0, 'changed': 0, 'written': 0, 'conflicts': 0}}
+                    for segment in range(self.segments)}
+        self._checkpoint = {'table': self.table_name, 'segments_total': self.segments, 'segments': segments}
+        if self.dry_run or not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return
+        with open(self.checkpoint_file, 'r', encoding='utf-8') as file:
+            saved = json.load(file)
+        if saved.get('table') != self.table_name or saved.get('segments_total') != self.segments:
+            raise ValueError(f"Checkpoint '{self.checkpoint_file}' was written for a different table or segment count")
+        self._checkpoint = saved
+        print(f"INFO: Resuming from checkpoint '{self.checkpoint_file}'")
+
+    def _save_checkpoint(self):
+        if self.dry_run or not self.checkpoint_file:
+            return
+        temporary_file = f"{self.checkpoint_file}.tmp"
+        with open(temporary_file, 'w', encoding='utf-8') as file:
+            json.dump(self._checkpoint, file)
+        os.replace(temporary_file, self.checkpoint_file)
+
+    def _segment_state(self, segment: int) -> Dict[str, Any]:
+        return self._checkpoint['segments'][str(segment)]
+
+    def _record_page(self, segment: int, last_key: Optional[Dict[str, Any]], counters: Dict[str, int]):
+        with self._lock:
+            state = self._segment_state(segment)
+            for name, value in counters.items():
+                state['counters'][name] += value
+            # Keys are stored as DynamoDB JSON so number keys survive the round trip.
+            state['last_key'] = {name: _serializer.serialize(value) for name, value in last_key.items()} \
+                if last_key else None
+            state['done'] = last_key is None
+            self._save_checkpoint()
+
+    # Writes
+
+    def _update_action(self, item: Dict[str, Any], changes: Dict[str, Any]) -> Dict[str, Any]:
+        names: Dict[str, str] = {}
+        values: Dict[str, Any] = {}
+        set_clauses = []
+        remove_clauses = []
+        for index, (attribute, value) in enumerate(changes.items()):
+            if attribute in self.key_attributes:
+                raise ValueError(f"Transform may not change key attribute '{attribute}'")
+            names[f"#a{index}"] = attribute
+            if value is REMOVE:
+                remove_clauses.append(f"#a{index}")
+            else:
+                values[f":a{index}"] = _serializer.serialize(value)
+                set_clauses.append(f"#a{index} = :a{index}")
+
+        update_expression = ''
+        if set_clauses:
+            update_expression += 'SET ' + ', '.join(set_clauses)
+        if remove_clauses:
+            update_expression += ' REMOVE ' + ', '.join(remove_clauses)
+
+        names['#k'] = self.key_attributes[0]
+        conditions = ['attribute_exists(#k)']
+        for index, attribute in enumerate(self.guard_attributes):
+            names[f"#g{index}"] = attribute
+            if attribute in item:
+                values[f":g{index}"] = _serializer.serialize(item[attribute])
+                conditions.append(f"#g{index} = :g{index}")
+            else:
+                conditions.append(f"attribute_not_exists(#g{index})")
+
+        update = {
+            'TableName': self.table_name,
+            'Key': {name: _serializer.serialize(item[name]) for name in self.key_attributes},
+            'UpdateExpression': update_expression.strip(),
+            'ConditionExpression': ' AND '.join(conditions),
+            'ExpressionAttributeNames': names
+        }
+        if values:
+            update['ExpressionAttributeValues'] = values
+        return {'Update': update}
+
+    def _write_batch(self, client, actions: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Write one transaction; items whose condition failed are counted as conflicts and dropped."""
+        counters = {'written': 0, 'conflicts': 0}
+        attempt = 0
+        while actions:
+            try:
+                response = self.retry_controller.call(
+                    client.transact_write_items, TransactItems=actions, ReturnConsumedCapacity='TOTAL')
+                self.write_limiter.consume(sum(c.get('CapacityUnits', 0) for c in response.get('ConsumedCapacity', [])))
+                counters['written'] += len(actions)
+                return counters
+            except ClientError as error:
+                if error.response.get('Error', {}).get('Code') != 'TransactionCanceledException':
+                    raise
+                reasons = [reason.get('Code', 'None') for reason in error.response.get('CancellationReasons', [])]
+                failed = [index for index, code in enumerate(reasons) if code == 'ConditionalCheckFailed']
+                if failed:
+                    # The rest of the transaction was fine; drop the conflicting items and resend.
+                    counters['conflicts'] += len(failed)
+                    actions = [action for index, action in enumerate(actions) if index not in failed]
+                else:
+                    # Throttling or a conflicting concurrent transaction: back off and resend.
+                    attempt += 1
+                    self.retry_controller.pause(attempt)
+        return counters
+
+    # Scan
+
+    def _run_segment(self, segment: int):
+        state = self._segment_state(segment)
+        if state['done']:
+            print(f"INFO: Segment {segment} already complete, skipping")
+            return
+
+        # boto3 resources are not thread-safe, so every segment gets its own session.
+        session = boto3.session.Session()
+        table = RetryingTable(session.resource('dynamodb', region_name=self.region_name,
+                                               config=SDK_RETRY_CONFIG).Table(self.table_name),
+                              self.retry_controller)
+        client = session.client('dynamodb', region_name=self.region_name, config=SDK_RETRY_CONFIG)
+
+        scan_kwargs: Dict[str, Any] = {
+            'Segment': segment,
+            'TotalSegments': self.segments,
+            'Limit': self.page_size,
+            'ReturnConsumedCapacity': 'TOTAL'
+        }
+        if state['last_key']:
+            scan_kwargs['ExclusiveStartKey'] = {name: _deserializer.deserialize(value)
+                                                for name, value in state['last_key'].items()}
+
+        while True:
+            response = table.scan(**scan_kwargs)
+            self.read_limiter.consume(response.get('ConsumedCapacity', {}).get('CapacityUnits', 0))
+
+            counters = {'scanned': 0, 'changed': 0, 'written': 0, 'conflicts': 0}
+            actions = []
+            for item in response.get('Items', []):
+                counters['scanned'] += 1
+                changes = self.transform(item)
+                if not changes:
+                    continue
+                counters['changed'] += 1
+                actions.append(self._update_action(item, changes))
+
+            if not self.dry_run:
+                for start in range(0, len(actions), self.batch_size):
+                    result = self._write_batch(client, actions[start:start + self.batch_size])
+                    counters['written'] += result['written']
+                    counters['conflicts'] += result['conflicts']
+
+            last_key = response.get('LastEvaluatedKey')
+            self._record_page(segment, last_key, counters)
+            if not last_key:
+                break
+            scan_kwargs['ExclusiveStartKey'] = last_key
+        print(f"SUCCESS: Segment {segment} complete: {self._segment_state(segment)['counters']}")
+
+    def run(self) -> Dict[str, int]:
+        self._load_checkpoint()
+        mode = "DRY RUN" if self.dry_run else "LIVE"
+        print(f"INFO: Migrating '{self.table_name}' with {self.segments} segments ({mode})")
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.segments) as executor:
+            for job in [executor.submit(self._run_segment, segment) for segment in range(self.segments)]:
+                job.result()
+
+        totals = {'scanned': 0, 'changed': 0, 'written': 0, 'conflicts': 0}
+        for state in self._checkpoint['segments'].values():
+            for name, value in state['counters'].items():
+                totals[name] += value
+        print(f"SUCCESS: Migration of '{self.table_name}' finished in {time.perf_counter() - started:.1f}s: {totals}")
+        return totals
+
+
+def resolve_transform(name: str) -> Transform:
+    if name in TRANSFORMS:
+        return TRANSFORMS[name]
+    module_name, _, function_name = name.partition(':')
+    if not function_name:
+        raise ValueError(f"Unknown transform '{name}', use one of {', '.join(TRANSFORMS)} or module:function")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Checkpointed parallel backfill for a DynamoDB table")
+    parser.add_argument("--table", required=True)
+    parser.add_argument("--transform", required=True, help=f"One of {', '.join(TRANSFORMS)} or module:function")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument("--read-capacity", type=float, help="Read capacity units per second to stay under")
+    parser.add_argument("--write-capacity", type=float, help="Write capacity units per second to stay under")
+    parser.add_argument("--checkpoint", help="Checkpoint file; an interrupted run resumes from it")
+    parser.add_argument("--guard", action="append", default=[],
+                        help="Only update if this attribute is unchanged since it was read (repeatable)")
+    parser.add_argument("--dry-run", action="store_true", help="Scan and transform without writing")
+    args = parser.parse_args()
+
+    try:
+        MigrationEngine(
+            args.table,
+            resolve_transform(args.transform),
+            segments=args.segments,
+            read_capacity_per_second=args.read_capacity,
+            write_capacity_per_second=args.write_capacity,
+            checkpoint_file=args.checkpoint,
+            guard_attributes=args.guard,
+            dry_run=args.dry_run
+        ).run()
+    except Exception as e:
+        print(f"ERROR: Migration failed: {str(e)}")
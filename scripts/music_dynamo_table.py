@@ -1,10 +1,63 @@
+import os
+import sys
+import time
 import boto3
 from pydantic import BaseModel, Field
 from botocore.exceptions import ClientError
 
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+from search_keys import search_key_attributes, ARTIST_NORM_YEAR_INDEX, TITLE_NORM_ALBUM_INDEX, ALBUM_NORM_INDEX
+
 AWS_REGION = "us-east-1"
 MUSIC_TABLE_NAME = "music"
 
+# GSIs over the normalized search keys used by the music Lambda's /search route
+SEARCH_INDEX_ATTRIBUTE_DEFINITIONS = [
+    {"AttributeName": "artist_norm", "AttributeType": "S"},
+    {"AttributeName": "title_norm", "AttributeType": "S"},
+    {"AttributeName": "album_norm", "AttributeType": "S"},
+    {"AttributeName": "year", "AttributeType": "N"}
+]
+# Indexes on the raw attributes that /search used before the normalized keys existed.
+LEGACY_INDEXES = ["TitleAlbumIndex"]
+SEARCH_INDEXES = [
+    {
+        "IndexName": ARTIST_NORM_YEAR_INDEX,
+        "KeySchema": [
+            {"AttributeName": "artist_norm", "KeyType": "HASH"},
+            {"AttributeName": "year", "KeyType": "RANGE"}
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+    },
+    {
+        "IndexName": TITLE_NORM_ALBUM_INDEX,
+        "KeySchema": [
+            {"AttributeName": "title_norm", "KeyType": "HASH"},
+            {"AttributeName": "album_norm", "KeyType": "RANGE"}
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+    },
+    {
+        "IndexName": ALBUM_NORM_INDEX,
+        "KeySchema": [
+            {"AttributeName": "album_norm", "KeyType": "HASH"},
+            {"AttributeName": "artist_norm", "KeyType": "RANGE"}
+        ],
+        "Projection": {"ProjectionType": "ALL"},
+        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
+    }
+]
+
+# New songs are fanned out to subscriber feeds by Lambda/feed.py
+STREAM_SPECIFICATION = {
+    "StreamEnabled": True,
+    "StreamViewType": "NEW_IMAGE"
+}
+
 class MusicItem(BaseModel):
     id: str | None = Field(None, description="UUID")
     title: str = Field(..., description="Title")
@@ -17,9 +70,10 @@ class MusicItem(BaseModel):
 class MusicDynamoDBOperations:
 
     def __init__(self, region_name: str = AWS_REGION):
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        self.dynamodb = boto3.resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
         self.table_name = MUSIC_TABLE_NAME
         self.table = None
+        self.retry_controller = RetryController(BULK_POLICY)
 
     def table_exists(self):
         try:
@@ -44,44 +98,19 @@ class MusicDynamoDBOperations:
                 AttributeDefinitions=[
                     {"AttributeName": "artist", "AttributeType": "S"},
                     {"AttributeName": "album#title", "AttributeType": "S"},
-                    {"AttributeName": "year", "AttributeType": "N"},
-                    {"AttributeName": "title", "AttributeType": "S"},
-                    {"AttributeName": "album", "AttributeType": "S"}
+                    *SEARCH_INDEX_ATTRIBUTE_DEFINITIONS
                 ],
                 KeySchema=[
                     {"AttributeName": "artist", "KeyType": "HASH"},  # Partition Key
                     {"AttributeName": "album#title",
                         "KeyType": "RANGE"}  # Sort Key
                 ],
-                LocalSecondaryIndexes=[
-                    {
-                        "IndexName": "ArtistYearIndex",
-                        "KeySchema": [
-                            # Same Partition Key
-                            {"AttributeName": "artist", "KeyType": "HASH"},
-                            # Sort Key for LSI
-                            {"AttributeName": "year", "KeyType": "RANGE"}
-                        ],
-                        "Projection": {"ProjectionType": "ALL"}
-                    }
-                ],
-                GlobalSecondaryIndexes=[
-                    {
-                        "IndexName": "TitleAlbumIndex",
-                        "KeySchema": [
-                            # Partition Key for GSI
-                            {"AttributeName": "title", "KeyType": "HASH"},
-                            # Sort Key for GSI
-                            {"AttributeName": "album", "KeyType": "RANGE"}
-                        ],
-                        "Projection": {"ProjectionType": "ALL"},
-                        "ProvisionedThroughput": {"ReadCapacityUnits": 5, "WriteCapacityUnits": 5}
-                    }
-                ],
+                GlobalSecondaryIndexes=SEARCH_INDEXES,
                 ProvisionedThroughput={
                     "ReadCapacityUnits": 5,
                     "WriteCapacityUnits": 5
-                }
+                },
+                StreamSpecification=STREAM_SPECIFICATION
             )
             self.table.wait_until_exists()
             print(f"SUCCESS: DynamoDB table created successfully: {self.table.item_count}")
@@ -89,11 +118,77 @@ class MusicDynamoDBOperations:
         except Exception as e:
             print(f"ERROR: Failed to create DynamoDB table: {str(e)}")
             raise e
-    
+
+    def wait_until_active(self):
+        """Block until the table is ACTIVE; DynamoDB rejects update_table while it is UPDATING."""
+        self.dynamodb.meta.client.get_waiter('table_exists').wait(
+            TableName=self.table_name,
+            WaiterConfig={'Delay': 10, 'MaxAttempts': 360}
+        )
+
+    def enable_stream(self):
+        """Enable the feed stream on a table created before it existed."""
+        try:
+            client = self.dynamodb.meta.client
+            current = client.describe_table(TableName=self.table_name)['Table'].get('StreamSpecification', {})
+            if current.get('StreamEnabled'):
+                if current.get('StreamViewType') != STREAM_SPECIFICATION['StreamViewType']:
+                    print(f"WARNING: Stream on '{self.table_name}' uses {current.get('StreamViewType')}, "
+                          f"the feed Lambda needs {STREAM_SPECIFICATION['StreamViewType']}")
+                return
+            print(f"INFO: Enabling stream on '{self.table_name}'")
+            client.update_table(TableName=self.table_name, StreamSpecification=STREAM_SPECIFICATION)
+            self.wait_until_active()
+            print(f"SUCCESS: Stream enabled on '{self.table_name}'")
+        except Exception as e:
+            print(f"ERROR: Failed to enable stream: {str(e)}")
+            raise e
+
+    def add_search_indexes(self):
+        """Add any missing normalized-search GSI to an existing table, one at a time, then drop the legacy one."""
+        try:
+            client = self.dynamodb.meta.client
+            existing = {
+                index['IndexName']
+                for index in client.describe_table(TableName=self.table_name)['Table'].get('GlobalSecondaryIndexes', [])
+            }
+            for index in SEARCH_INDEXES:
+                if index['IndexName'] in existing:
+                    continue
+                self.wait_until_active()
+                print(f"INFO: Creating index '{index['IndexName']}' on '{self.table_name}'")
+                client.update_table(
+                    TableName=self.table_name,
+                    AttributeDefinitions=SEARCH_INDEX_ATTRIBUTE_DEFINITIONS,
+                    GlobalSecondaryIndexUpdates=[{'Create': index}]
+                )
+                # DynamoDB only allows one index to be created at a time.
+                while True:
+                    indexes = client.describe_table(TableName=self.table_name)['Table']['GlobalSecondaryIndexes']
+                    status = next(i['IndexStatus'] for i in indexes if i['IndexName'] == index['IndexName'])
+                    if status == 'ACTIVE':
+                        break
+                    time.sleep(10)
+                print(f"SUCCESS: Index '{index['IndexName']}' is active")
+            # Nothing queries the raw-attribute GSI any more, but it still consumes write capacity.
+            for index_name in LEGACY_INDEXES:
+                if index_name not in existing:
+                    continue
+                self.wait_until_active()
+                print(f"INFO: Deleting unused index '{index_name}' on '{self.table_name}'")
+                client.update_table(
+                    TableName=self.table_name,
+                    GlobalSecondaryIndexUpdates=[{'Delete': {'IndexName': index_name}}]
+                )
+                print(f"SUCCESS: Index '{index_name}' is being deleted")
+        except Exception as e:
+            print(f"ERROR: Failed to add search indexes: {str(e)}")
+            raise e
+
     def insert_music_data(self, music: MusicItem):
         try:
             print(f"INFO: Inserting music data for '{music.title}'")
-            self.table = self.dynamodb.Table(self.table_name)
+            self.table = RetryingTable(self.dynamodb.Table(self.table_name), self.retry_controller)
             
             item = {
                 "artist": music.artist,
@@ -103,8 +198,8 @@ class MusicDynamoDBOperations:
                 "title": music.title,
                 "img_url": music.s3_url
             }
-            
-            
+            item.update(search_key_attributes(item))
+
             self.table.put_item(Item=item)
             print(f"SUCCESS: Inserted music data for '{music.title}'")
         except Exception as e:
@@ -115,5 +210,7 @@ if __name__ == "__main__":
     try:
         music_dynamo_db_ops = MusicDynamoDBOperations()
         music_dynamo_db_ops.create_table()
+        music_dynamo_db_ops.enable_stream()
+        music_dynamo_db_ops.add_search_indexes()
     except Exception as e:
         print(f"ERROR: Failed in main execution: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,118 @@
+import os
+import sys
+import argparse
+from collections import Counter
+import boto3
+from botocore.exceptions import ClientError
+
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+
+AWS_REGION = "us-east-1"
+POPULARITY_TABLE_NAME = "popularity"
+USER_TABLE_NAME = "users"
+COUNTER_SHARDS = 8
+
+class PopularityDynamoDBOperations:
+
+    def __init__(self, region_name: str = AWS_REGION):
+        self.dynamodb = boto3.resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
+        self.table_name = POPULARITY_TABLE_NAME
+        self.table = None
+        self.retry_controller = RetryController(BULK_POLICY)
+
+    def table_exists(self):
+        """Check if the table already exists."""
+        try:
+            table = self.dynamodb.Table(self.table_name)
+            table.load()
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ResourceNotFoundException':
+                return False
+            raise
+
+    def create_table(self):
+        """Create the popularity table (sharded song counters and materialized top lists)."""
+        try:
+            if self.table_exists():
+                print(f"INFO: Table '{self.table_name}' already exists, using existing table")
+                self.table = self.dynamodb.Table(self.table_name)
+                return self.table
+
+            print(f"INFO: Creating DynamoDB table '{POPULARITY_TABLE_NAME}'")
+            self.table = self.dynamodb.create_table(
+                TableName=self.table_name,
+                KeySchema=[
+                    # SONG#<artist>#<album>#<title> or TOP#<scope>
+                    {'AttributeName': 'pk', 'KeyType': 'HASH'},
+                    # Counter shard number, 0 for top lists
+                    {'AttributeName': 'sk', 'KeyType': 'RANGE'}
+                ],
+                AttributeDefinitions=[
+                    {'AttributeName': 'pk', 'AttributeType': 'S'},
+                    {'AttributeName': 'sk', 'AttributeType': 'N'},
+                ],
+                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+            )
+            self.table.wait_until_exists()
+            print(f"SUCCESS: DynamoDB table created successfully: {self.table.item_count}")
+            return self.table
+        except Exception as e:
+            print(f"ERROR: Failed to create DynamoDB table: {str(e)}")
+            raise e
+
+    def seed_from_users(self):
+        """One-off: count existing subscriptions so counters start from the current state."""
+        try:
+            users = RetryingTable(self.dynamodb.Table(USER_TABLE_NAME), self.retry_controller)
+            table = RetryingTable(self.dynamodb.Table(self.table_name), self.retry_controller)
+            counts = Counter()
+            songs = {}
+            scan_kwargs = {'ProjectionExpression': 'subscription'}
+            while True:
+                response = users.scan(**scan_kwargs)
+                for user in response.get('Items', []):
+                    for song in user.get('subscription', []):
+                        key = f"SONG#{song['artist']}#{song['album']}#{song['title']}"
+                        counts[key] += 1
+                        songs[key] = song
+                if 'LastEvaluatedKey' not in response:
+                    break
+                scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+            with table.batch_writer() as batch:
+                for key, count in counts.items():
+                    song = songs[key]
+                    # Seed shards are overwritten, so spread the count over all of them.
+                    for shard in range(COUNTER_SHARDS):
+                        share = count // COUNTER_SHARDS + (1 if shard < count % COUNTER_SHARDS else 0)
+                        batch.put_item(Item={
+                            'pk': key,
+                            'sk': shard,
+                            'subscribers': share,
+                            'artist': song['artist'],
+                            'album': song['album'],
+                            'title': song['title'],
+                            'year': int(song['year']),
+                            'img_url': song.get('img_url')
+                        })
+            print(f"SUCCESS: Seeded subscriber counters for {len(counts)} songs")
+        except Exception as e:
+            print(f"ERROR: Failed to seed subscriber counters: {str(e)}")
+            raise e
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the popularity table")
+    parser.add_argument("--seed-from-users", action="store_true",
+                        help="Initialise counters from existing subscriptions (scans the users table once)")
+    args = parser.parse_args()
+
+    try:
+        popularity_dynamo_db_ops = PopularityDynamoDBOperations()
+        popularity_dynamo_db_ops.create_table()
+        if args.seed_from_users:
+            popularity_dynamo_db_ops.seed_from_users()
+    except Exception as e:
+        print(f"ERROR: Failed in main execution: {str(e)}")
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import pstats
+import argparse
+import tarfile
+from typing import Dict, List, Tuple
+
+# Converts a Lambda profile artifact (see Lambda/profiling.py) to the folded-stack format
+# read by flamegraph.pl, speedscope and inferno:
+#   ./flamegraph.pl music.folded > music.svg
+MAX_DEPTH = 200
+# Output resolution; paths carrying less time than this are not expanded further, which
+# keeps the walk bounded on dense call graphs (e.g. a cold boto3 import).
+MIN_PATH_SECONDS = 1e-6
+
+Function = Tuple[str, int, str]
+
+
+def read_artifact(path: str) -> Tuple[pstats.Stats, Dict]:
+    """Load the pstats and summary from a .tar.gz artifact, or bare pstats from a .prof file."""
+    if not tarfile.is_tarfile(path):
+        return pstats.Stats(path), {}
+    with tarfile.open(path, mode='r:gz') as archive:
+        profile_bytes = archive.extractfile('profile.prof').read()
+        summary = json.load(archive.extractfile('summary.json'))
+    profile_path = f"{path}.prof"
+    with open(profile_path, 'wb') as file:
+        file.write(profile_bytes)
+    try:
+        return pstats.Stats(profile_path), summary
+    finally:
+        os.remove(profile_path)
+
+
+def _label(function: Function) -> str:
+    filename, line, name = function
+    if filename == '~':
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def folded_stacks(stats: pstats.Stats) -> Dict[str, int]:
+    """Microseconds per call stack.
+
+    cProfile records caller/callee edges rather than full stacks, so a function's time is
+    split across its callers in proportion to the time each edge contributed.
+    """
+    raw = stats.stats
+    callees: Dict[Function, Dict[Function, float]] = {}
+    for function, (_, _, _, _, callers) in raw.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            callees.setdefault(caller, {})[function] = edge_cumulative
+    # Time not explained by any caller edge was spent in calls made from outside the profile
+    # (e.g. the handler itself, or imports triggered from C), so it starts a stack of its own.
+    roots = {}
+    for function, (_, _, _, cumulative_seconds, callers) in raw.items():
+        called_seconds = sum(edge[3] for caller, edge in callers.items() if caller != function)
+        if cumulative_seconds - called_seconds >= MIN_PATH_SECONDS:
+            roots[function] = cumulative_seconds - called_seconds
+
+    stacks: Dict[str, int] = {}
+
+    def walk(function: Function, path: List[Function], path_seconds: float):
+        _, _, own_seconds, cumulative_seconds, _ = raw[function]
+        if cumulative_seconds <= 0:
+            return
+        share = path_seconds / cumulative_seconds
+        path = path + [function]
+        microseconds = int(own_seconds * share * 1e6)
+        if microseconds > 0:
+            key = ';'.join(_label(frame) for frame in path)
+            stacks[key] = stacks.get(key, 0) + microseconds
+        if len(path) >= MAX_DEPTH:
+            return
+        for callee, edge_seconds in callees.get(function, {}).items():
+            # Recursive calls are already counted in the outer frame's cumulative time.
+            callee_seconds = edge_seconds * share
+            if callee not in path and callee in raw and callee_seconds >= MIN_PATH_SECONDS:
+                walk(callee, path, callee_seconds)
+
+    for root, root_seconds in roots.items():
+        walk(root, [], root_seconds)
+    return stacks
+
+
+def write_folded(stacks: Dict[str, int], output) -> None:
+    for stack, microseconds in sorted(stacks.items()):
+        output.write(f"{stack} {microseconds}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert a Lambda profile artifact to folded stacks")
+    parser.add_argument("artifact", help="Profile .tar.gz downloaded from S3 or /tmp (or a bare .prof)")
+    parser.add_argument("--output", help="Folded stacks file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        profile_stats, profile_summary = read_artifact(args.artifact)
+        folded = folded_stacks(profile_stats)
+        if args.output:
+            with open(args.output, 'w') as folded_file:
+                write_folded(folded, folded_file)
+            print(f"INFO: Wrote {len(folded)} stacks to {args.output}")
+        else:
+            write_folded(folded, sys.stdout)
+        if profile_summary:
+            print(f"INFO: {profile_summary.get('method')} {profile_summary.get('path')} "
+                  f"took {profile_summary['total_seconds']:.3f}s, phases {profile_summary['phases']}, "
+                  f"peak memory {profile_summary['memory']['peak_bytes']} bytes", file=sys.stderr)
+    except Exception as e:
+        print(f"ERROR: Failed in main execution: {str(e)}")
@@ -0,0 +1,201 @@
+import os
+import sys
+import gzip
+import json
+import time
+import random
+import hashlib
+import argparse
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List
+import boto3
+from music_dynamo_table import MusicDynamoDBOperations, MUSIC_TABLE_NAME
+from user_dynamo_table import UserDynamoDBOperations, USER_TABLE_NAME
+
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from snapshot import SnapshotWriter
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+from search_keys import search_key_attributes
+
+AWS_REGION = "us-east-1"
+S3_BUCKET_NAME = "a1-project-group-31"
+
+DEFAULT_SEED = 31
+DEFAULT_USERS = 1_000_000
+DEFAULT_SONGS = 100_000
+DEFAULT_ARTISTS = 5_000
+DEFAULT_WORKERS = 8
+# Exponent of the Zipf distributions; ~1 matches typical music catalogs.
+DEFAULT_ZIPF_S = 1.07
+# Keeps the largest user item far below DynamoDB's 400 KB limit.
+MAX_SUBSCRIPTIONS = 500
+SYNTHETIC_PASSWORD = hashlib.sha256("password".encode()).hexdigest()
+
+
+def zipf_cum_weights(count: int, s: float) -> List[float]:
+    return list(accumulate(1.0 / (rank ** s) for rank in range(1, count + 1)))
+
+
+class SyntheticCatalog:
+    """Songs whose artists and albums follow Zipfian popularity; deterministic for a seed."""
+
+    def __init__(self, songs: int, artists: int, seed: int, zipf_s: float = DEFAULT_ZIPF_S):
+        rng = random.Random(seed)
+        artist_weights = zipf_cum_weights(artists, zipf_s)
+        album_weights = zipf_cum_weights(12, zipf_s)
+        artist_ranks = rng.choices(range(artists), cum_weights=artist_weights, k=songs)
+        album_ranks = rng.choices(range(12), cum_weights=album_weights, k=songs)
+        artist_debut = [rng.randint(1960, 2020) for _ in range(artists)]
+
+        self.songs: List[Dict[str, Any]] = []
+        for index, (artist_rank, album_rank) in enumerate(zip(artist_ranks, album_ranks)):
+            artist = f"Synthetic Artist {artist_rank:05d}"
+            album = f"Album {album_rank + 1} of {artist_rank:05d}"
+            title = f"Track {index:07d}"
+            song = {
+                'artist': artist,
+                'album#title': f"{album}#{title}",
+                'year': min(artist_debut[artist_rank] + album_rank * 2, 2025),
+                'album': album,
+                'title': title,
+                'img_url': f"https://{S3_BUCKET_NAME}.s3.{AWS_REGION}.amazonaws.com/artist_images/synthetic_{artist_rank:05d}.jpg"
+            }
+            song.update(search_key_attributes(song))
+            self.songs.append(song)
+        # Song popularity for subscriptions is Zipfian too, over a shuffled order so that
+        # popular songs are spread across artists rather than being the first indexes.
+        self.popularity_order = list(range(songs))
+        rng.shuffle(self.popularity_order)
+        self.popularity_weights = zipf_cum_weights(songs, zipf_s)
+
+    def __len__(self) -> int:
+        return len(self.songs)
+
+
+def subscription_count(rng: random.Random) -> int:
+    """Heavy-tailed: about a third of users never subscribe, a few subscribe to hundreds."""
+    if rng.random() < 0.35:
+        return 0
+    return min(int(rng.lognormvariate(1.6, 1.1)) + 1, MAX_SUBSCRIPTIONS)
+
+
+def generate_users(catalog: SyntheticCatalog, start: int, stop: int, seed: int) -> Iterator[Dict[str, Any]]:
+    """Users [start, stop). Each user is seeded from its index, so output does not depend on sharding."""
+    rng = random.Random()
+    for index in range(start, stop):
+        rng.seed(f"{seed}:{index}")
+        count = subscription_count(rng)
+        picks = set(rng.choices(catalog.popularity_order, cum_weights=catalog.popularity_weights, k=count))
+        subscriptions = []
+        for song_index in sorted(picks):
+            song = catalog.songs[song_index]
+            subscriptions.append({
+                'artist': song['artist'],
+                'album': song['album'],
+                'title': song['title'],
+                'year': song['year'],
+                'img_url': song['img_url']
+            })
+        yield {
+            'email': f"user{index:08d}@synthetic.example",
+            'username': f"Synthetic User {index}",
+            'password': SYNTHETIC_PASSWORD,
+            'subscription': subscriptions
+        }
+
+
+def _shards(total: int, count: int) -> List[range]:
+    size = max(1, -(-total // count))
+    return [range(start, min(start + size, total)) for start in range(0, total, size)]
+
+
+def _load_items(
+        table_name: str,
+        region_name: str,
+        controller: RetryController,
+        items: Iterator[Dict[str, Any]]
+) -> int:
+    # boto3 resources are not thread-safe, so every worker gets its own session.
+    # The controller is shared, so all workers back off together when a table throttles.
+    resource = boto3.session.Session().resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
+    table = RetryingTable(resource.Table(table_name), controller)
+    written = 0
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+            written += 1
+    return written
+
+
+def bulk_load(catalog: SyntheticCatalog, users: int, seed: int, workers: int, region_name: str = AWS_REGION):
+    try:
+        MusicDynamoDBOperations(region_name).create_table()
+        UserDynamoDBOperations(region_name).create_table()
+
+        music_controller = RetryController(BULK_POLICY)
+        users_controller = RetryController(BULK_POLICY)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            song_jobs = [
+                executor.submit(_load_items, MUSIC_TABLE_NAME, region_name, music_controller,
+                                iter(catalog.songs[shard.start:shard.stop]))
+                for shard in _shards(len(catalog), workers)
+            ]
+            user_jobs = [
+                executor.submit(_load_items, USER_TABLE_NAME, region_name, users_controller,
+                                generate_users(catalog, shard.start, shard.stop, seed))
+                for shard in _shards(users, workers)
+            ]
+            songs_written = sum(job.result() for job in song_jobs)
+            users_written = sum(job.result() for job in user_jobs)
+        print(f"SUCCESS: Loaded {songs_written} songs and {users_written} users "
+              f"in {time.perf_counter() - started:.1f}s")
+        print(f"INFO: Retry stats music={music_controller.stats()} users={users_controller.stats()}")
+    except Exception as e:
+        print(f"ERROR: Failed to bulk load synthetic data: {str(e)}")
+        raise e
+
+
+def write_files(catalog: SyntheticCatalog, users: int, seed: int, output_dir: str):
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        snapshot_path = os.path.join(output_dir, "music.snap")
+        writer = SnapshotWriter()
+        for song in catalog.songs:
+            writer.add(song)
+        writer.write(snapshot_path)
+        print(f"SUCCESS: Wrote {len(catalog)} songs to '{snapshot_path}'")
+
+        users_path = os.path.join(output_dir, "users.jsonl.gz")
+        with gzip.open(users_path, "wt", encoding="utf-8") as file:
+            for user in generate_users(catalog, 0, users, seed):
+                file.write(json.dumps(user, separators=(',', ':')))
+                file.write("\n")
+        print(f"SUCCESS: Wrote {users} users to '{users_path}'")
+    except Exception as e:
+        print(f"ERROR: Failed to write synthetic data files: {str(e)}")
+        raise e
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic users and catalog")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--songs", type=int, default=DEFAULT_SONGS)
+    parser.add_argument("--artists", type=int, default=DEFAULT_ARTISTS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--zipf-s", type=float, default=DEFAULT_ZIPF_S)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--output-dir", help="Write snapshot files here instead of loading DynamoDB")
+    args = parser.parse_args()
+
+    try:
+        print(f"INFO: Generating {args.songs} songs by {args.artists} artists (seed {args.seed})")
+        synthetic_catalog = SyntheticCatalog(args.songs, args.artists, args.seed, args.zipf_s)
+        if args.output_dir:
+            write_files(synthetic_catalog, args.users, args.seed, args.output_dir)
+        else:
+            bulk_load(synthetic_catalog, args.users, args.seed, args.workers)
+    except Exception as e:
+        print(f"ERROR: Failed in main execution: {str(e)}")
@@ -1,9 +1,15 @@
+import os
+import sys
 import boto3
 import hashlib
 from pydantic import BaseModel, Field
 from botocore.exceptions import ClientError
 import random
 
+# Modules shared with the Lambdas live in ../Lambda
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Lambda'))
+from retry import SDK_RETRY_CONFIG, BULK_POLICY, RetryController, RetryingTable
+
 AWS_REGION = "us-east-1"
 USER_TABLE_NAME = "users"
 
@@ -16,9 +22,10 @@ class UserItem(BaseModel):
 class UserDynamoDBOperations:
 
     def __init__(self, region_name: str = AWS_REGION):
-        self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+        self.dynamodb = boto3.resource('dynamodb', region_name=region_name, config=SDK_RETRY_CONFIG)
         self.table_name = USER_TABLE_NAME
         self.table = None
+        self.retry_controller = RetryController(BULK_POLICY)
 
     def table_exists(self):
         """Check if the table already exists."""
@@ -61,7 +68,7 @@ class UserDynamoDBOperations:
         """Insert a user item into the DynamoDB table."""
         try:
             print(f"INFO: Inserting User data for '{user.username}'")
-            self.table = self.dynamodb.Table(self.table_name)
+            self.table = RetryingTable(self.dynamodb.Table(self.table_name), self.retry_controller)
             item = {
                 'email': user.email,
                 'username': user.username,
@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+from moto import mock_aws
+
+# Fake credentials so nothing can reach a real account; the Lambda modules create boto3
+# clients at import time, so these must be set before any of them is imported.
+os.environ['AWS_DEFAULT_REGION'] = 'us-east-1'
+os.environ['AWS_ACCESS_KEY_ID'] = 'testing'
+os.environ['AWS_SECRET_ACCESS_KEY'] = 'testing'
+os.environ['AWS_SESSION_TOKEN'] = 'testing'
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'Lambda'), os.path.join(ROOT, 'scripts')]
+
+from retry import RetryPolicy  # noqa: E402
+
+# Retries without sleeping, for tests that exercise the retry paths.
+FAST_POLICY = RetryPolicy('test', max_attempts=3, base_delay=0.0, max_delay=0.0,
+                          initial_rate=1000.0, max_rate=1000.0, min_rate=1.0)
+
+
+@pytest.fixture
+def aws():
+    with mock_aws():
+        yield
+
+
+@pytest.fixture
+def music_table(aws):
+    import boto3
+    table = boto3.resource('dynamodb').create_table(
+        TableName='music',
+        KeySchema=[
+            {'AttributeName': 'artist', 'KeyType': 'HASH'},
+            {'AttributeName': 'album#title', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'artist', 'AttributeType': 'S'},
+            {'AttributeName': 'album#title', 'AttributeType': 'S'}
+        ],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    for index in range(20):
+        album, title = f"Album {index % 3}", f"Song {index:02d}"
+        table.put_item(Item={'artist': f"Artist {index % 4}", 'album#title': f"{album}#{title}",
+                             'album': album, 'title': title, 'year': 2000 + index})
+    return table
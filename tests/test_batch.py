@@ -0,0 +1,57 @@
+import boto3
+from batch import fetch_items
+from cache import CachedTable, LRUCache
+from retry import RetryController
+from conftest import FAST_POLICY
+
+
+class RecordingClient:
+    """Wraps the DynamoDB resource; with `partial`, the first BatchGetItem processes one key only."""
+
+    def __init__(self, dynamodb, partial=False):
+        self.dynamodb = dynamodb
+        self.partial = partial
+        self.requests = []
+
+    def batch_get_item(self, RequestItems):
+        self.requests.append(RequestItems)
+        if not self.partial or len(self.requests) > 1:
+            return self.dynamodb.batch_get_item(RequestItems=RequestItems)
+        keys = RequestItems['music']['Keys']
+        response = self.dynamodb.batch_get_item(RequestItems={'music': dict(RequestItems['music'], Keys=keys[:1])})
+        response['UnprocessedKeys'] = {'music': dict(RequestItems['music'], Keys=keys[1:])}
+        return response
+
+
+def _key(index):
+    return {'artist': f"Artist {index % 4}", 'album#title': f"Album {index % 3}#Song {index:02d}"}
+
+
+def test_fetch_items_retries_unprocessed_keys(music_table):
+    client = RecordingClient(boto3.resource('dynamodb'), partial=True)
+    results = fetch_items(client, {
+        'first': (music_table, _key(0)),
+        'second': (music_table, _key(1)),
+        'missing': (music_table, {'artist': 'Nobody', 'album#title': 'None#None'})
+    }, RetryController(FAST_POLICY))
+
+    assert len(client.requests) == 2
+    assert results['first']['title'] == 'Song 00'
+    assert results['second']['title'] == 'Song 01'
+    assert results['missing'] is None
+
+
+def test_fetch_items_uses_and_fills_the_cache(music_table):
+    table = CachedTable(music_table, ('artist', 'album#title'), LRUCache(), ttl=60)
+    client = RecordingClient(boto3.resource('dynamodb'))
+    controller = RetryController(FAST_POLICY)
+
+    fetch_items(client, {'song': (table, _key(2))}, controller)
+    assert len(client.requests) == 1
+    cached = fetch_items(client, {'song': (table, _key(2))}, controller)
+    assert len(client.requests) == 1
+    assert cached['song']['title'] == 'Song 02'
+
+    fetch_items(client, {'song': (table, _key(2))}, controller, consistent=('song',))
+    assert len(client.requests) == 2
+    assert client.requests[-1]['music']['ConsistentRead'] is True
@@ -0,0 +1,70 @@
+import json
+import boto3
+import pytest
+from migrate import MigrationEngine, music_search_keys
+
+
+class Interrupted(Exception):
+    pass
+
+
+def _engine(**kwargs):
+    return MigrationEngine('music', music_search_keys, segments=1, page_size=5, **kwargs)
+
+
+def test_checkpoint_resumes_after_interrupted_segment(music_table, tmp_path):
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    calls = []
+
+    def failing_transform(item):
+        calls.append(item)
+        if len(calls) == 12:
+            raise Interrupted()
+        return music_search_keys(item)
+
+    engine = _engine(checkpoint_file=checkpoint)
+    engine.transform = failing_transform
+    with pytest.raises(Interrupted):
+        engine.run()
+
+    with open(checkpoint) as file:
+        state = json.load(file)['segments']['0']
+    assert state['done'] is False
+    assert state['counters']['scanned'] == 10
+
+    calls.clear()
+    resumed = _engine(checkpoint_file=checkpoint)
+    resumed.transform = lambda item: calls.append(item) or music_search_keys(item)
+    totals = resumed.run()
+
+    # Only the pages after the last recorded one are scanned again.
+    assert len(calls) == 10
+    assert totals['scanned'] == 20
+    assert totals['written'] == 20
+    items = music_table.scan()['Items']
+    assert all(item['artist_norm'] == item['artist'].lower() for item in items)
+
+
+def test_write_batch_drops_conflicting_items(music_table):
+    engine = _engine(guard_attributes=['year'])
+    items = sorted(music_table.scan()['Items'], key=lambda item: item['title'])[:3]
+    actions = [engine._update_action(item, music_search_keys(item)) for item in items]
+    # Another writer changes the guarded attribute between the read and the write.
+    music_table.update_item(Key={'artist': items[1]['artist'], 'album#title': items[1]['album#title']},
+                            UpdateExpression='SET #y = :y', ExpressionAttributeNames={'#y': 'year'},
+                            ExpressionAttributeValues={':y': 1999})
+
+    counters = engine._write_batch(boto3.client('dynamodb'), actions)
+
+    assert counters == {'written': 2, 'conflicts': 1}
+    updated = {item['title']: item for item in music_table.scan()['Items']}
+    assert 'artist_norm' in updated[items[0]['title']]
+    assert 'artist_norm' not in updated[items[1]['title']]
+    assert 'artist_norm' in updated[items[2]['title']]
+
+
+def test_dry_run_writes_nothing(music_table):
+    totals = _engine(dry_run=True).run()
+    assert totals['changed'] == 20
+    assert totals['written'] == 0
+    assert all('artist_norm' not in item for item in music_table.scan()['Items'])
@@ -0,0 +1,68 @@
+import pytest
+from botocore.exceptions import ClientError
+from retry import AdaptiveTokenBucket, RetryController
+from conftest import FAST_POLICY
+
+
+def _error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'GetItem')
+
+
+def test_token_bucket_halves_on_throttle_and_recovers_on_success():
+    bucket = AdaptiveTokenBucket(rate=100.0, max_rate=200.0, min_rate=10.0)
+    bucket.on_throttle()
+    assert bucket.rate == 50.0
+    bucket.on_throttle()
+    assert bucket.rate == 25.0
+    bucket.on_success()
+    assert bucket.rate == 27.0
+
+
+def test_token_bucket_rate_stays_within_bounds():
+    bucket = AdaptiveTokenBucket(rate=12.0, max_rate=20.0, min_rate=10.0)
+    bucket.on_throttle()
+    assert bucket.rate == 10.0
+    for _ in range(100):
+        bucket.on_success()
+    assert bucket.rate == 20.0
+
+
+def test_controller_retries_throttling_and_slows_down():
+    controller = RetryController(FAST_POLICY)
+    outcomes = [_error('ProvisionedThroughputExceededException'), _error('ThrottlingException'), 'ok']
+
+    def operation():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert controller.call(operation) == 'ok'
+    stats = controller.stats()
+    assert stats['throttles'] == 2
+    assert stats['retries'] == 2
+    assert stats['rate'] < FAST_POLICY.initial_rate
+
+
+def test_controller_gives_up_after_max_attempts():
+    controller = RetryController(FAST_POLICY)
+
+    def operation():
+        raise _error('InternalServerError')
+
+    with pytest.raises(ClientError):
+        controller.call(operation)
+    assert controller.stats()['give_ups'] == 1
+
+
+def test_controller_does_not_retry_other_errors():
+    controller = RetryController(FAST_POLICY)
+    calls = []
+
+    def operation():
+        calls.append(1)
+        raise _error('ValidationException')
+
+    with pytest.raises(ClientError):
+        controller.call(operation)
+    assert len(calls) == 1
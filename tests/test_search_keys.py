@@ -0,0 +1,20 @@
+import pytest
+from search_keys import normalize_search_key, search_key_attributes
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('Taylor Swift', 'taylor swift'),
+    ('  Beyoncé  Knowles ', 'beyonce knowles'),
+    ('MÖTLEY CRÜE', 'motley crue'),
+    ('Straße', 'strasse'),
+    ('ﬁre', 'fire'),
+    ('tab\tand\nnewline', 'tab and newline'),
+    ('', ''),
+])
+def test_normalize_search_key(value, expected):
+    assert normalize_search_key(value) == expected
+
+
+def test_search_key_attributes_skips_empty_values():
+    attributes = search_key_attributes({'artist': 'Sigur Rós', 'album': '   ', 'title': 'Hoppípolla'})
+    assert attributes == {'artist_norm': 'sigur ros', 'title_norm': 'hoppipolla'}